@@ -0,0 +1,243 @@
+"""
+bench.py
+
+Benchmarks for the Sudoku engine.
+
+    python bench.py encodings --corpus testcases --count 200 --seed 0
+
+compares the rule encodings of q1 on a fixed, seeded sample of puzzles,
+reporting variables, clauses, encode time and solve time for each. Solving
+never uses the propagation pre-pass, so every puzzle exercises the encoding.
+
+    python bench.py run --corpus testcases --seed 0 --out current.json
+    python bench.py compare baseline.json current.json --tolerance 0.1
+
+times the encode, solve and decode phases of every puzzle in a seeded sample,
+writes p50/p95/p99, throughput and (with --propagate) how many of the n**3
+candidates propagation removed to JSON, and flags regressions of one run
+against a stored baseline (exit status 1 when any are found).
+
+    python bench.py cache --count 30 --scrambles 6 --seed 0
+
+checks the symmetry cache of cache.py: seeded generated puzzles and random
+band, stack, row, column, transpose and relabeling scrambles of them go
+through one SolutionCache, every answer mapped back by from_canonical must
+solve its own puzzle (exit status 1 otherwise), and the report counts how
+many scrambles shared their original's canonical key.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from cache import SolutionCache, cached_solve, canonicalize
+from corpus import iter_puzzles, reservoir_sample
+from generator import PuzzleGenerator
+from q1 import ENCODINGS, SudokuSolver, encode_rules
+from validate import validate_batch
+
+
+def bench_encodings(puzzles, n: int = 9, encodings=ENCODINGS, solver_name: str = 'glucose3'):
+    """Yields one row of measurements per encoding for the given puzzles."""
+    for encoding in encodings:
+        start = time.perf_counter()
+        cnf = encode_rules(n, encoding)
+        encode_time = time.perf_counter() - start
+        with SudokuSolver(n, solver_name, propagate=False, encoding=encoding) as engine:
+            start = time.perf_counter()
+            unsolved = sum(engine.solve(p) is None for p in puzzles)
+            solve_time = time.perf_counter() - start
+        yield {'encoding': encoding, 'vars': cnf.nv, 'clauses': len(cnf.clauses),
+               'encode_s': encode_time, 'solve_s': solve_time,
+               'solve_ms_per_puzzle': 1000 * solve_time / max(len(puzzles), 1), 'unsat': unsolved}
+
+
+PHASES = ('encode', 'solve', 'decode', 'total')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, p: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def run_benchmark(puzzles, n: int = 9, **engine_options) -> dict:
+    """Solves every puzzle once on a fresh engine and summarizes the per-phase timings."""
+    times = {phase: [] for phase in PHASES}
+    unsolved = 0
+    with SudokuSolver(n, **engine_options) as engine:
+        start = time.perf_counter()
+        for puzzle in puzzles:
+            unsolved += engine.solve(puzzle) is None
+            stats = engine.last_stats
+            times['encode'].append(stats['encode_s'])
+            times['solve'].append(stats['solve_s'])
+            times['decode'].append(stats['decode_s'])
+            times['total'].append(stats['encode_s'] + stats['solve_s'] + stats['decode_s'])
+        wall = time.perf_counter() - start
+        counts = engine.stats
+    candidates = len(puzzles) * n**3
+    summary = {'puzzles': len(puzzles), 'unsat': unsolved, 'wall_s': wall,
+               'throughput_per_s': len(puzzles) / wall if wall else 0.0,
+               'propagated': counts['propagated'],
+               'candidates_removed': 1 - counts['open_candidates'] / candidates if candidates else 0.0,
+               'phases': {}}
+    for phase, values in times.items():
+        if values:
+            row = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+            row['mean'] = sum(values) / len(values)
+            summary['phases'][phase] = row
+    return summary
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1, min_delta: float = 1e-5):
+    """
+    Returns (rows, regressions) comparing two run summaries.
+
+    A percentile regresses when it grows by more than `tolerance` (relative)
+    and by more than `min_delta` seconds; throughput regresses when it drops
+    by more than `tolerance`.
+    """
+    rows, regressions = [], []
+    for phase in PHASES:
+        for key in [f'p{p}' for p in PERCENTILES]:
+            old = baseline['phases'].get(phase, {}).get(key)
+            new = current['phases'].get(phase, {}).get(key)
+            if old is None or new is None:
+                continue
+            bad = new > old * (1 + tolerance) and new - old > min_delta
+            rows.append((f'{phase} {key}', old, new, bad))
+            if bad:
+                regressions.append(f'{phase} {key}')
+    old, new = baseline['throughput_per_s'], current['throughput_per_s']
+    bad = new < old * (1 - tolerance)
+    rows.append(('throughput/s', old, new, bad))
+    if bad:
+        regressions.append('throughput')
+    return rows, regressions
+
+
+def scramble(grid, rng):
+    """A random symmetry of a puzzle: bands, stacks, rows and columns inside them, transposition, digits."""
+    n = len(grid)
+    b = math.isqrt(n)
+
+    def line_order():
+        bands = rng.sample(range(b), b)
+        return [k*b + i for k in bands for i in rng.sample(range(b), b)]
+
+    rows, cols, digits = line_order(), line_order(), [0] + rng.sample(range(1, n+1), n)
+    out = [[digits[grid[r][c]] for c in cols] for r in rows]
+    return [list(col) for col in zip(*out)] if rng.random() < 0.5 else out
+
+
+def check_cache(count: int, scrambles: int, n: int = 9, seed: int = 0) -> dict:
+    """Solves generated puzzles and scrambles of them through one SolutionCache and validates every answer."""
+    rng = random.Random(seed)
+    generator = PuzzleGenerator(n, seed)
+    engine = SudokuSolver(n)
+    cache = SolutionCache()
+    puzzles, answers = [], []
+    shared = 0
+    for _ in range(count):
+        original = generator.generate()
+        key, _ = canonicalize(original)
+        for variant in [original] + [scramble(original, rng) for _ in range(scrambles)]:
+            shared += variant is not original and canonicalize(variant)[0] == key
+            solved = cached_solve(variant, cache, engine.solve)
+            puzzles.append(variant)
+            answers.append(solved if solved is not None else [[0] * n for _ in range(n)])
+    failed = validate_batch(answers, puzzles)
+    return {'puzzles': len(puzzles), 'failed': int(failed.sum()), 'shared_keys': shared,
+            'scrambles': count * scrambles, 'cached': len(cache.memory)}
+
+
+def _print_table(rows):
+    header = f"{'encoding':<12}{'vars':>9}{'clauses':>10}{'encode s':>10}{'solve s':>10}{'ms/puzzle':>11}{'unsat':>7}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['encoding']:<12}{row['vars']:>9}{row['clauses']:>10}{row['encode_s']:>10.3f}"
+              f"{row['solve_s']:>10.3f}{row['solve_ms_per_puzzle']:>11.3f}{row['unsat']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sudoku engine benchmarks.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enc = sub.add_parser('encodings', help="compare rule encodings on a fixed puzzle set")
+    enc.add_argument('--corpus', default='testcases')
+    enc.add_argument('--size', type=int, default=9)
+    enc.add_argument('--count', type=int, default=200)
+    enc.add_argument('--seed', type=int, default=0)
+    enc.add_argument('--solver', default='glucose3')
+    enc.add_argument('--encodings', nargs='+', default=list(ENCODINGS), choices=ENCODINGS)
+
+    run = sub.add_parser('run', help="time encode/solve/decode per puzzle and write a JSON summary")
+    run.add_argument('--corpus', default='testcases')
+    run.add_argument('--name', default=None, help="corpus name recorded in the report (default: file name)")
+    run.add_argument('--size', type=int, default=9)
+    run.add_argument('--count', type=int, default=500)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--solver', default='glucose3')
+    run.add_argument('--encoding', default='extended', choices=ENCODINGS)
+    run.add_argument('--propagate', action='store_true', help="run the singles pre-pass first")
+    run.add_argument('--out', default='bench.json')
+
+    cmp = sub.add_parser('compare', help="flag regressions of a run against a baseline")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--tolerance', type=float, default=0.1)
+
+    chk = sub.add_parser('cache', help="check the symmetry cache on seeded scrambles of generated puzzles")
+    chk.add_argument('--size', type=int, default=9)
+    chk.add_argument('--count', type=int, default=30, help="generated puzzles")
+    chk.add_argument('--scrambles', type=int, default=6, help="scrambles of each puzzle")
+    chk.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        puzzles = reservoir_sample(iter_puzzles(args.corpus, args.size), args.count, args.seed)
+        options = {'solver_name': args.solver, 'encoding': args.encoding, 'propagate': args.propagate}
+        report = {'corpus': args.name or os.path.basename(args.corpus), 'seed': args.seed,
+                  'size': args.size, 'config': options}
+        report.update(run_benchmark(puzzles, args.size, **options))
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        for phase, row in report['phases'].items():
+            print(f"{phase:<7}" + ''.join(f"  {k} {v*1000:8.3f}ms" for k, v in row.items()))
+        if args.propagate:
+            print(f"propagation finished {report['propagated']} puzzles and removed "
+                  f"{report['candidates_removed']:.1%} of the candidates")
+        print(f"{report['puzzles']} puzzles, {report['throughput_per_s']:.1f} puzzles/s -> {args.out}")
+    elif args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        for key in ('corpus', 'seed', 'size', 'puzzles', 'config'):
+            if baseline.get(key) != current.get(key):
+                print(f"warning: {key} differs ({baseline.get(key)} vs {current.get(key)})")
+        rows, regressions = compare(baseline, current, args.tolerance)
+        for label, old, new, bad in rows:
+            change = (new - old) / old if old else 0.0
+            print(f"{label:<14}{old:>12.6g}{new:>12.6g}{change:>+9.1%}{'  REGRESSION' if bad else ''}")
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("no regressions")
+    elif args.command == 'encodings':
+        puzzles = reservoir_sample(iter_puzzles(args.corpus, args.size), args.count, args.seed)
+        print(f"{len(puzzles)} puzzles of size {args.size} from {args.corpus} (seed {args.seed})")
+        _print_table(bench_encodings(puzzles, args.size, args.encodings, args.solver))
+    elif args.command == 'cache':
+        report = check_cache(args.count, args.scrambles, args.size, args.seed)
+        print(f"{report['puzzles']} puzzles solved through the cache, {report['failed']} wrong answers")
+        print(f"{report['shared_keys']}/{report['scrambles']} scrambles shared their original's key, "
+              f"{report['cached']} entries cached")
+        sys.exit(1 if report['failed'] else 0)
@@ -0,0 +1,192 @@
+"""
+cache.py
+
+Symmetry-canonicalized result cache for Sudoku.
+
+Puzzles that differ only by digit relabeling, row permutations inside a band,
+column permutations inside a stack, band or stack swaps, or transposition have
+solutions that map onto each other. `canonicalize` picks one representative of
+such a family together with the transform that produced it, and
+`SolutionCache` stores solutions of representatives in a bounded in-memory LRU
+with an optional sqlite tier on disk.
+
+The representative is chosen by ordering bands, rows, stacks and columns by
+clue counts (which the symmetries preserve) and taking the lexicographically
+smallest relabeled grid over the orderings of tied lines. When there are too
+many ties only part of them is explored; equivalent puzzles may then miss each
+other in the cache, but every hit is still mapped back correctly because the
+exact transform of each puzzle is kept.
+
+Canonicalizing takes longer than a warm SAT call on the same puzzle, so the
+cache only pays off when puzzles repeat; q1.solve_sudoku uses it on request.
+"""
+
+import itertools
+import math
+import sqlite3
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from corpus import format_puzzle, grid_side, parse_puzzle
+
+
+class Transform(NamedTuple):
+    """canonical[i][j] = relabel[oriented[rows[i]][cols[j]]], oriented = grid or its transpose."""
+    transpose: bool
+    rows: Tuple[int, ...]
+    cols: Tuple[int, ...]
+    relabel: Tuple[int, ...]
+
+
+def _line_orders(grid: List[List[int]], b: int, limit: int) -> List[Tuple[int, ...]]:
+    """Candidate row orders: bands and rows inside bands sorted by clue count, ties permuted."""
+    counts = [sum(1 for v in row if v) for row in grid]
+    band_key = lambda k: (sum(counts[k*b:(k+1)*b]), sorted(counts[k*b:(k+1)*b]))
+    bands = sorted(range(b), key=band_key, reverse=True)
+    # Each entry of a choices list holds the alternative orderings of one run of tied items.
+    band_orders = _product([list(itertools.permutations(tied))
+                            for _, tied in itertools.groupby(bands, key=band_key)], limit)
+    row_orders = []
+    for k in range(b):
+        rows = sorted(range(k*b, (k+1)*b), key=lambda r: counts[r], reverse=True)
+        row_orders.append(_product([list(itertools.permutations(tied))
+                                    for _, tied in itertools.groupby(rows, key=lambda r: counts[r])], limit))
+    orders = []
+    for band_order in band_orders:
+        orders += _product([row_orders[k] for k in band_order], limit)
+        if len(orders) >= limit:
+            break
+    return orders[:limit]
+
+
+def _product(choices, limit):
+    """Concatenated combinations of the alternatives in `choices`, at most `limit` of them."""
+    out = []
+    for combo in itertools.product(*choices):
+        out.append(tuple(itertools.chain.from_iterable(combo)))
+        if len(out) >= limit:
+            break
+    return out
+
+
+def canonicalize(grid: List[List[int]], limit: int = 64) -> Tuple[str, Transform]:
+    """Returns the canonical puzzle string of a grid and the transform that maps the grid onto it."""
+    n = len(grid)
+    if any(not 0 <= v <= n for row in grid for v in row):
+        raise ValueError(f"Cell values must be between 0 and {n}.")
+    b = math.isqrt(n)
+    best = None
+    for transpose in (False, True):
+        oriented = [list(col) for col in zip(*grid)] if transpose else grid
+        flipped = [list(col) for col in zip(*oriented)]
+        row_orders = _line_orders(oriented, b, limit)
+        col_orders = _line_orders(flipped, b, limit)
+        for rows in row_orders:
+            for cols in col_orders[:max(1, limit // len(row_orders))]:
+                relabel = [0] * (n + 1)
+                nxt = 1
+                cells = []
+                for r in rows:
+                    row = oriented[r]
+                    for c in cols:
+                        v = row[c]
+                        if v and not relabel[v]:
+                            relabel[v] = nxt
+                            nxt += 1
+                        cells.append(relabel[v])
+                if best is None or cells < best[0]:
+                    # Digits absent from the puzzle take the remaining labels in order.
+                    for v in range(1, n + 1):
+                        if not relabel[v]:
+                            relabel[v] = nxt
+                            nxt += 1
+                    best = (cells, Transform(transpose, rows, cols, tuple(relabel)))
+    cells, transform = best
+    return format_puzzle([cells[r*n:(r+1)*n] for r in range(n)]), transform
+
+
+def from_canonical(grid: List[List[int]], t: Transform) -> List[List[int]]:
+    """Maps a canonical grid back to the orientation and labels of the original puzzle."""
+    n = len(grid)
+    inverse = [0] * (n + 1)
+    for v, label in enumerate(t.relabel):
+        inverse[label] = v
+    oriented = [[0] * n for _ in range(n)]
+    for i, r in enumerate(t.rows):
+        for j, c in enumerate(t.cols):
+            oriented[r][c] = inverse[grid[i][j]]
+    return [list(col) for col in zip(*oriented)] if t.transpose else oriented
+
+
+class SolutionCache:
+    """
+    LRU cache of solutions keyed by canonical puzzle, with an optional sqlite tier.
+
+    Values are canonical solution strings, or '' for puzzles known to have no
+    solution. Misses in memory fall through to the database when `path` is
+    given, and entries found there are promoted to memory.
+    """
+
+    def __init__(self, maxsize: int = 100000, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.hits = self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (puzzle TEXT PRIMARY KEY, solution TEXT)")
+            self.db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+        elif self.db is not None:
+            row = self.db.execute("SELECT solution FROM solutions WHERE puzzle = ?", (key,)).fetchone()
+            if row is not None:
+                value = row[0]
+                self._remember(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: str):
+        self._remember(key, value)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)", (key, value))
+            self.db.commit()
+
+    def _remember(self, key: str, value: str):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def cached_solve(grid: List[List[int]], cache: SolutionCache, solve) -> Optional[List[List[int]]]:
+    """
+    Looks a puzzle up by its canonical form and calls `solve` only on a miss.
+
+    `solve` receives the canonical puzzle, so the stored solution can be
+    shared by every puzzle in the same symmetry family. Sizes that the line
+    format cannot hold (see corpus.grid_side) bypass the cache.
+    """
+    n = len(grid)
+    if grid_side(n*n) != n:
+        return solve(grid)
+    key, transform = canonicalize(grid)
+    value = cache.get(key)
+    if value is None:
+        solved = solve(parse_puzzle(key, n))
+        value = format_puzzle(solved) if solved is not None else ''
+        cache.put(key, value)
+    if not value:
+        return None
+    return from_canonical(parse_puzzle(value, n), transform)
@@ -0,0 +1,107 @@
+"""
+corpus.py
+
+Streaming reader for Sudoku corpora with one puzzle per line.
+
+The file is memory-mapped and parsed lazily, so a multi-GB corpus never sits
+in memory as a list of strings. Byte-offset shards let several workers split
+one file between them, and reservoir sampling draws a fixed-size sample in a
+single pass.
+"""
+
+import math
+import mmap
+import os
+import random
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Cell symbols in value order; '0' and '.' mark blanks.
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_VALUES = {ord(ch): i + 1 for i, ch in enumerate(SYMBOLS)}
+_VALUES[ord('0')] = 0
+_VALUES[ord('.')] = 0
+
+
+def grid_side(length: int) -> Optional[int]:
+    """Side of the grid stored in a line of the given length, or None if no Sudoku has that many cells."""
+    n = math.isqrt(length)
+    b = math.isqrt(n)
+    if n * n != length or b * b != n or n < 4 or n > len(SYMBOLS):
+        return None
+    return n
+
+
+def parse_puzzle(line, n: Optional[int] = None) -> Optional[List[List[int]]]:
+    """
+    Converts one line (str or bytes) to an n x n grid with 0 for blanks.
+
+    Returns None when the line is not a puzzle of size n (any size when n is None).
+    """
+    if isinstance(line, str):
+        line = line.encode()
+    line = line.strip()
+    side = grid_side(len(line))
+    if side is None or (n is not None and side != n):
+        return None
+    values = [_VALUES.get(ch) for ch in line]
+    if None in values or max(values) > side:
+        return None
+    return [values[r*side:(r+1)*side] for r in range(side)]
+
+
+def format_puzzle(grid: List[List[int]]) -> str:
+    """Inverse of parse_puzzle, using '0' for blanks."""
+    return ''.join(SYMBOLS[v-1] if v else '0' for row in grid for v in row)
+
+
+def iter_puzzles(path: str, n: Optional[int] = 9, start: int = 0,
+                 end: Optional[int] = None) -> Iterator[List[List[int]]]:
+    """
+    Lazily yields the puzzles of a corpus file.
+
+    Only lines whose first byte lies in [start, end) are read, so the ranges
+    returned by shard_ranges partition the file without splitting any line.
+    Lines that are not n x n puzzles are skipped (n=None accepts every size).
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            end = size if end is None else min(end, size)
+            pos = 0
+            if start > 0:
+                # The line containing byte start-1 belongs to the previous shard.
+                pos = mm.find(b'\n', start - 1)
+                if pos < 0:
+                    return
+                pos += 1
+            while pos < end:
+                nl = mm.find(b'\n', pos)
+                if nl < 0:
+                    nl = size
+                grid = parse_puzzle(mm[pos:nl], n)
+                if grid is not None:
+                    yield grid
+                pos = nl + 1
+
+
+def shard_ranges(path: str, shards: int) -> List[Tuple[int, int]]:
+    """Splits a file into `shards` contiguous byte ranges for iter_puzzles."""
+    size = os.path.getsize(path)
+    step = -(-size // shards) if size else 0
+    return [(min(i * step, size), min((i + 1) * step, size)) for i in range(shards)]
+
+
+def reservoir_sample(items: Iterable, k: int, seed: Optional[int] = None) -> list:
+    """Uniform sample of k items from an iterable of unknown length in a single pass."""
+    rng = random.Random(seed)
+    sample = []
+    for i, item in enumerate(items):
+        if i < k:
+            sample.append(item)
+        else:
+            j = rng.randrange(i + 1)
+            if j < k:
+                sample[j] = item
+    return sample
@@ -0,0 +1,133 @@
+"""
+generator.py
+
+Minimal-clue Sudoku generator built on the SAT engine.
+
+A puzzle starts as a full random grid, completed by a fresh solver from
+random diagonal boxes and random phases. Clues are then removed one at a time
+in random order, and a removal is kept only if the remaining clues still force
+the original solution. Every check runs on one persistent solver: the clues are
+passed as assumption literals and the known solution is excluded by a single
+selector-guarded blocking clause, so nothing is re-encoded per removal.
+
+A single pass is enough for minimality: removing clues never makes an earlier,
+rejected clue removable again.
+
+Usage:
+    python generator.py --count 1000 --seed 1 --workers 8 > puzzles.txt
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+from typing import Iterator, List, Optional
+
+from pysat.solvers import Solver
+
+from corpus import format_puzzle
+from q1 import SudokuSolver
+
+
+class PuzzleGenerator:
+    """Generates uniquely solvable puzzles of one size from a persistent solver."""
+
+    def __init__(self, n: int = 9, seed: Optional[int] = None, solver_name: str = 'glucose3'):
+        self.engine = SudokuSolver(n, solver_name, propagate=False)
+        self.rng = random.Random(seed)
+
+    def random_solution(self) -> List[List[int]]:
+        """
+        A full grid drawn from the rng alone. The boxes on the diagonal share
+        no row or column, so they are filled with independent random
+        permutations; a fresh solver completes the grid, preferring a random
+        digit in every other cell. Unlike a model of the persistent solver it
+        does not depend on what that solver solved before.
+        """
+        rng, engine = self.rng, self.engine
+        n, b = engine.n, engine.box
+        givens = []
+        for k in range(b):
+            digits = rng.sample(range(1, n+1), n)
+            givens += [engine.var(k*b + i//b, k*b + i%b, v) for i, v in enumerate(digits)]
+        phases = []
+        for cell in range(n*n):
+            preferred = rng.randrange(n)
+            phases += [cell*n + v + 1 if v == preferred else -(cell*n + v + 1) for v in range(n)]
+        with Solver(name=engine.solver_name, bootstrap_with=engine.cnf.clauses) as solver:
+            solver.set_phases(phases)
+            solver.solve(assumptions=givens)
+            return engine.decode(solver.get_model())
+
+    def generate(self, target_clues: int = 0) -> List[List[int]]:
+        """
+        Returns a puzzle with a unique solution.
+
+        Clues are removed until none can go (a minimal puzzle) or only
+        target_clues remain, whichever comes first.
+        """
+        engine, n = self.engine, self.engine.n
+        solution = self.random_solution()
+        clues = {r*n + c: engine.var(r, c, solution[r][c]) for r in range(n) for c in range(n)}
+        selector = engine.new_var()
+        engine.solver.add_clause([-selector] + [-lit for lit in clues.values()])
+
+        order = list(clues)
+        self.rng.shuffle(order)
+        for cell in order:
+            if len(clues) <= target_clues:
+                break
+            lit = clues.pop(cell)
+            # Another solution under the remaining clues means the clue is needed.
+            if engine.solver.solve(assumptions=list(clues.values()) + [selector]):
+                clues[cell] = lit
+        engine.solver.add_clause([-selector])
+
+        puzzle = [[0]*n for _ in range(n)]
+        for cell in clues:
+            r, c = divmod(cell, n)
+            puzzle[r][c] = solution[r][c]
+        return puzzle
+
+
+_generators = {}
+
+
+def _generate_one(task) -> List[List[int]]:
+    n, seed, target_clues = task
+    generator = _generators.get(n)
+    if generator is None:
+        generator = _generators[n] = PuzzleGenerator(n)
+    generator.rng.seed(seed)
+    return generator.generate(target_clues)
+
+
+def generate_batch(count: int, n: int = 9, seed: Optional[int] = None, target_clues: int = 0,
+                   workers: Optional[int] = None, chunksize: int = 16) -> Iterator[List[List[int]]]:
+    """
+    Generates `count` puzzles over a process pool, one persistent generator per worker.
+
+    Puzzle i is seeded from (seed, i), so a seeded batch is reproducible
+    regardless of the number of workers.
+    """
+    base = random.Random(seed).getrandbits(64)
+    tasks = ((n, base + i, target_clues) for i in range(count))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(_generate_one, tasks)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(_generate_one, tasks, chunksize)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate minimal Sudoku puzzles, one per line.")
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--size', type=int, default=9)
+    parser.add_argument('--clues', type=int, default=0, help="stop once this many clues remain")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    for puzzle in generate_batch(args.count, args.size, args.seed, args.clues, args.workers):
+        sys.stdout.write(format_puzzle(puzzle) + '\n')
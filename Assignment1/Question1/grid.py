@@ -0,0 +1,97 @@
+"""
+grid.py
+
+Compact Sudoku grid backed by a flat byte buffer.
+
+A Grid keeps the puzzle in its text form, one ASCII symbol per cell in
+row-major order (see corpus.SYMBOLS; '0' or '.' for blanks). Wrapping a line
+of a corpus file therefore needs no conversion or copy, and the numeric values
+are produced in C by `bytes.translate` when they are needed.
+"""
+
+from typing import List, Optional, Union
+
+from corpus import SYMBOLS, grid_side
+
+_BAD = 255
+_VALUE_OF = bytearray([_BAD]) * 256
+for _i, _ch in enumerate(SYMBOLS):
+    _VALUE_OF[ord(_ch)] = _i + 1
+_VALUE_OF[ord('0')] = _VALUE_OF[ord('.')] = 0
+_VALUE_OF = bytes(_VALUE_OF)
+
+_SYMBOL_OF = bytearray(b'0') * 256
+for _i, _ch in enumerate(SYMBOLS):
+    _SYMBOL_OF[_i + 1] = ord(_ch)
+_SYMBOL_OF = bytes(_SYMBOL_OF)
+
+
+class Grid:
+    """n x n Sudoku grid stored as n*n symbol bytes."""
+
+    __slots__ = ('n', 'buf')
+
+    def __init__(self, buf: Union[bytes, bytearray], n: Optional[int] = None):
+        side = grid_side(len(buf))
+        if side is None or (n is not None and side != n):
+            raise ValueError(f"{len(buf)} cells do not form a Sudoku grid.")
+        values = buf.translate(_VALUE_OF)
+        if _BAD in values or max(values) > side:
+            raise ValueError("Grid contains symbols outside the digit range.")
+        self.n = side
+        self.buf = buf
+
+    @classmethod
+    def from_string(cls, text: Union[str, bytes, bytearray]) -> 'Grid':
+        """Wraps a puzzle line; bytes and bytearray are used as the buffer without copying."""
+        if isinstance(text, str):
+            text = text.strip().encode('ascii')
+        return cls(text)
+
+    @classmethod
+    def from_values(cls, values, n: Optional[int] = None) -> 'Grid':
+        """Builds a grid from a flat sequence of cell values (0 for blanks)."""
+        return cls(bytearray(values).translate(_SYMBOL_OF), n)
+
+    @classmethod
+    def from_rows(cls, rows: List[List[int]]) -> 'Grid':
+        return cls.from_values([v for row in rows for v in row], len(rows))
+
+    def values(self) -> bytes:
+        """Flat row-major cell values, 0 for blanks."""
+        return self.buf.translate(_VALUE_OF)
+
+    def to_rows(self) -> List[List[int]]:
+        values, n = self.values(), self.n
+        return [list(values[r*n:(r+1)*n]) for r in range(n)]
+
+    def copy(self) -> 'Grid':
+        return Grid(bytearray(self.buf), self.n)
+
+    def __getitem__(self, pos) -> int:
+        r, c = pos
+        return _VALUE_OF[self.buf[r*self.n + c]]
+
+    def __setitem__(self, pos, value: int):
+        r, c = pos
+        if not 0 <= value <= self.n:
+            raise ValueError(f"{value} is not a digit of a {self.n}x{self.n} grid.")
+        if not isinstance(self.buf, bytearray):
+            # Wrapped immutable input: copy on first write.
+            self.buf = bytearray(self.buf)
+        self.buf[r*self.n + c] = _SYMBOL_OF[value]
+
+    def __str__(self) -> str:
+        return self.buf.decode('ascii')
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.buf)
+
+    def __repr__(self) -> str:
+        return f"Grid({str(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Grid) and self.values() == other.values()
+
+    # Grids can be assigned to, so they are not hashable; use bytes(grid) as a key.
+    __hash__ = None
@@ -4,53 +4,481 @@ sudoku_solver.py
 Implement the function `solve_sudoku(grid: List[List[int]]) -> List[List[int]]` using a SAT solver from PySAT.
 """
 
+from pysat.card import CardEnc, EncType
 from pysat.formula import CNF
 from pysat.solvers import Solver
-from typing import List
-import random
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+import functools
+import math
+import multiprocessing
+import numbers
+import os
+import sys
+import time
 
-def solve_sudoku(grid: List[List[int]]) -> List[List[int]]:
-    """Solves a Sudoku puzzle using a SAT solver. Input is a 2D grid with 0s for blanks."""
+from cache import SolutionCache, cached_solve
+from grid import Grid
+from propagation import propagate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from satkit.budget import SAT, UNKNOWN, UNSAT, Budget, BudgetExhausted, solve_budgeted
+from satkit.formula_cache import FormulaCache
+from satkit.portfolio import solve_portfolio
+
+
+def box_size(n: int) -> int:
+    """Side of a box for an n x n grid, raising ValueError when n is not a perfect square."""
+    b = math.isqrt(n)
+    if b < 1 or b * b != n:
+        raise ValueError(f"Grid size {n} is not square with square subgrids.")
+    return b
+
+
+def check_grid(grid: List[List[int]]):
+    """Raises ValueError unless grid is an n x n puzzle of integers 0..n with square boxes."""
+    n = len(grid)
+    box_size(n)
+    if any(len(row) != n for row in grid):
+        raise ValueError(f"Expected a {n}x{n} grid.")
+    if any(not isinstance(v, numbers.Integral) or not 0 <= v <= n for row in grid for v in row):
+        raise ValueError(f"Cell values must be integers between 0 and {n}.")
+
+
+def constraint_groups(n: int = 9):
+    """
+    Yields the (kind, literals) groups of an n x n Sudoku, each of which must
+    contain exactly one true literal: every cell holds one digit, and every
+    digit appears once per row, column and box.
+
+    Variables are numbered densely as (r*n + c)*n + v for 0-based row r and
+    column c and digit v in 1..n, so the formula uses exactly n**3 variables.
+    """
+    b = box_size(n)
+    var = lambda r, c, v: (r*n + c)*n + v
+    for r in range(n):
+        for c in range(n):
+            yield 'cell', [var(r, c, v) for v in range(1, n+1)]
+    for r in range(n):
+        for v in range(1, n+1):
+            yield 'row', [var(r, c, v) for c in range(n)]
+    for c in range(n):
+        for v in range(1, n+1):
+            yield 'col', [var(r, c, v) for r in range(n)]
+    for br in range(0, n, b):
+        for bc in range(0, n, b):
+            for v in range(1, n+1):
+                yield 'box', [var(br+i, bc+j, v) for i in range(b) for j in range(b)]
+
+
+# minimal: at-least-one per row/column/box digit and at-most-one per cell.
+# extended: at-least-one and pairwise at-most-one for every group.
+# seqcounter/totalizer/ladder: exactly-one per group through pysat.card.
+ENCODINGS = ('minimal', 'extended', 'seqcounter', 'totalizer', 'ladder')
+
+# Bump whenever encode_rules changes, so cached formulas are not reused.
+ENCODING_VERSION = 1
+
+
+def encode_group(kind: str, lits: List[int], encoding: str, top: int):
+    """
+    Clauses for one exactly-one group under the given encoding.
+
+    Returns (clauses, top) where top is the largest variable used so far,
+    including any auxiliary variables of the cardinality encodings.
+    """
+    if encoding == 'minimal' or encoding == 'extended':
+        clauses = []
+        if encoding == 'extended' or kind != 'cell':
+            clauses.append(list(lits))
+        if encoding == 'extended' or kind == 'cell':
+            for x in range(len(lits)):
+                for y in range(x+1, len(lits)):
+                    clauses.append([-lits[x], -lits[y]])
+        return clauses, top
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding {encoding!r}, expected one of {ENCODINGS}.")
+    enc = CardEnc.equals(lits=lits, bound=1, top_id=top, encoding=getattr(EncType, encoding))
+    return enc.clauses, max(top, enc.nv)
+
+
+def encode_rules(n: int = 9, encoding: str = 'extended') -> CNF:
+    """
+    Builds the puzzle independent clauses of an n x n Sudoku.
+
+    The default 'extended' encoding gives every group an at-least-one clause
+    and pairwise at-most-one clauses. The row/column/box at-most-one clauses
+    are implied by the others, but without them the solver barely propagates
+    on 16x16 and larger grids.
+    """
     cnf = CNF()
-    for i in range(1,10) :
-        for n in range(1,10) :
-            cnf.append(list(range(100*i+n+10,100*i+n+100,10)))
-
-    for j in range(1,10) :
-        for n in range(1,10) :
-            cnf.append(list(range(10*j+n+100,10*j+n+1000,100)))
-
-    for i in range(1,10) :
-        for j in range(1,10) :
-            for x in range(1,10) :
-                for y in range(x+1,10):
-                    cnf.append([-(100*i+10*j+x),-(100*i+10*j+y)])
-    for i in {1,4,7}:
-        for j in {1,4,7}:
-            for k in range(1,10):        
-                cnf.append([i*100+j*10+k,i*100+(j+1)*10+k,i*100+(j+2)*10+k,(i+1)*100+j*10+k,(i+1)*100+(j+1)*10+k,(i+1)*100+(j+2)*10+k,(i+2)*100+j*10+k,(i+2)*100+(j+1)*10+k,(i+2)*100+(j+2)*10+k])
-
-    for i in range(1,10):
-        for j in range(1,10):
-            if(grid[i-1][j-1]!=0):
-                cnf.append([i*100+j*10+grid[i-1][j-1]])
-
-    with Solver(name='glucose3') as solver:
-        solver.append_formula(cnf.clauses)
-        if solver.solve():
-            model = solver.get_model()
-        else :
-            print("unsat")
-    for i in range(1,10):
-            for j in range(1,10):
-                for k in range(1,10):
-                    if model[i*100+j*10+k-1]>0:
-                        grid[i-1][j-1]=k
-
-    return grid
-        
-
-
-
-    # TODO: implement encoding and solving using PySAT
-    
\ No newline at end of file
+    top = n**3
+    for kind, lits in constraint_groups(n):
+        clauses, top = encode_group(kind, lits, encoding, top)
+        cnf.extend(clauses)
+    cnf.nv = max(cnf.nv, top)
+    return cnf
+
+
+class SudokuSolver:
+    """
+    Reusable Sudoku engine for n x n grids (n = 9, 16, 25, 36, ...).
+
+    The rule clauses are the same for every puzzle of a given size, so they are
+    encoded once and loaded into a single solver. Each puzzle is solved by
+    passing its givens as assumptions, which keeps the solver (and everything
+    it has learned) warm between calls. `encoding` selects one of ENCODINGS.
+
+    With propagate=True naked and hidden singles run first. Puzzles they
+    finish never reach pysat; for the rest the decided cells and eliminated
+    candidates are passed to the warm solver as extra assumptions. `stats`
+    counts how often propagation was enough and how many of the n**3
+    candidates it left open (all of them without propagation); bench.py run
+    reports the reduction. It is off by default: on 9x9 puzzles the Python
+    pre-pass alone takes longer than a warm SAT call.
+
+    `portfolio` is an optional list of pysat backend names; when given, each
+    SAT call races those backends in separate processes (see
+    satkit.portfolio) instead of using the warm solver. When every backend
+    fails, `solve` raises satkit.portfolio.PortfolioError.
+
+    With a `formula_cache` the rule formula is loaded from (or saved to) the
+    cache instead of being encoded in Python; see satkit.formula_cache.
+
+    `solve` takes an optional satkit.budget.Budget. A puzzle whose budget runs
+    out also returns None; `last_status` tells it apart from an unsolvable one
+    ('SAT', 'UNSAT' or 'UNKNOWN'), and `last_stats` then includes the solver
+    counters of the call.
+    """
+
+    def __init__(self, n: int = 9, solver_name: str = 'glucose3', propagate: bool = False,
+                 encoding: str = 'extended', portfolio: Optional[Sequence[str]] = None,
+                 formula_cache: Optional[FormulaCache] = None):
+        self.n = n
+        self.box = box_size(n)
+        self.solver_name = solver_name
+        self.propagate = propagate
+        self.encoding = encoding
+        self.portfolio = portfolio
+        self.groups = list(constraint_groups(n))
+        if formula_cache is not None:
+            self.cnf = formula_cache.get_or_build(('sudoku', n, encoding, ENCODING_VERSION),
+                                                  lambda: encode_rules(n, encoding))
+        else:
+            self.cnf = encode_rules(n, encoding)
+        self.solver = Solver(name=solver_name, bootstrap_with=self.cnf.clauses)
+        self.top = self.cnf.nv
+        self.stats = {'puzzles': 0, 'propagated': 0, 'open_candidates': 0}
+        self.last_stats = {}
+        self.last_status = None
+
+    def var(self, r: int, c: int, v: int) -> int:
+        """Variable ID for digit v (1-based) in row r, column c (0-based)."""
+        return (r*self.n + c)*self.n + v
+
+    def assumptions(self, grid: List[List[int]]) -> List[int]:
+        """Givens of the puzzle as positive literals, raising ValueError for a malformed grid."""
+        n = self.n
+        if len(grid) != n:
+            raise ValueError(f"Expected a {n}x{n} grid.")
+        check_grid(grid)
+        return [self.var(r, c, grid[r][c]) for r in range(n) for c in range(n) if grid[r][c] != 0]
+
+    def _record(self, propagated: bool, open_candidates: int):
+        """Counts a puzzle and the candidates (of n**3) still open when the SAT call starts."""
+        self.last_stats = {'propagated': propagated, 'open_candidates': open_candidates}
+        self.stats['puzzles'] += 1
+        self.stats['propagated'] += propagated
+        self.stats['open_candidates'] += open_candidates
+
+    def _timings(self, start: float, encoded: float, solved: float):
+        """Adds per-phase wall-clock times of the last puzzle to last_stats."""
+        self.last_stats['encode_s'] = encoded - start
+        self.last_stats['solve_s'] = solved - encoded
+        self.last_stats['decode_s'] = time.perf_counter() - solved
+
+    def _sat_call(self, assumptions: List[int], budget: Optional[Budget]) -> Optional[List[int]]:
+        """
+        One bounded SAT call on the warm solver (or the portfolio) under
+        `assumptions`. Sets last_status and returns the model.
+        """
+        if self.portfolio:
+            budget = budget or Budget()
+            result = solve_portfolio(self.cnf.clauses, self.portfolio, assumptions=assumptions,
+                                     timeout=budget.time, conflicts=budget.conflicts,
+                                     propagations=budget.propagations)
+            status = UNKNOWN if result.sat is None else SAT if result.sat else UNSAT
+            stats, model = result.stats, result.model
+        else:
+            status, stats = solve_budgeted(self.solver, self.solver_name, assumptions, budget)
+            model = self.solver.get_model() if status == SAT else None
+        self.last_status = status
+        self.last_stats.update(stats)
+        return model
+
+    def solve(self, grid: List[List[int]], budget: Optional[Budget] = None) -> Optional[List[List[int]]]:
+        """Solves a puzzle, returning the filled grid or None when it has no solution or the budget ran out."""
+        start = time.perf_counter()
+        givens = self.assumptions(grid)
+        if self.propagate:
+            return self._solve_propagated(grid, start, budget)
+        self._record(False, self.n**3)
+        encoded = time.perf_counter()
+        model = self._sat_call(givens, budget)
+        solved = time.perf_counter()
+        grid = self.decode(model) if model is not None else None
+        self._timings(start, encoded, solved)
+        return grid
+
+    def solve_values(self, values, budget: Optional[Budget] = None) -> Optional[bytearray]:
+        """
+        Flat form of solve: takes the n*n row-major cell values (0 for blanks)
+        and returns those of the solution, as decode_values does.
+        """
+        n = self.n
+        if len(values) != n*n or any(not 0 <= v <= n for v in values):
+            raise ValueError(f"Expected {n*n} cell values between 0 and {n}.")
+        if self.propagate:
+            solved = self.solve([list(values[r*n:(r+1)*n]) for r in range(n)], budget)
+            return bytearray(v for row in solved for v in row) if solved is not None else None
+        start = time.perf_counter()
+        givens = [cell*n + v for cell, v in enumerate(values) if v]
+        self._record(False, n**3)
+        encoded = time.perf_counter()
+        model = self._sat_call(givens, budget)
+        solved = time.perf_counter()
+        values = self.decode_values(model) if model is not None else None
+        self._timings(start, encoded, solved)
+        return values
+
+    def decode_values(self, model: List[int]) -> bytearray:
+        """Flat row-major cell values read off the positive cell literals of a model."""
+        n = self.n
+        values = bytearray(n*n)
+        for lit in model[:n**3]:
+            if lit > 0:
+                cell, v = divmod(lit-1, n)
+                values[cell] = v+1
+        return values
+
+    def decode(self, model: List[int]) -> List[List[int]]:
+        """Reads the filled grid off a model of the rule formula."""
+        values, n = self.decode_values(model), self.n
+        return [list(values[r*n:(r+1)*n]) for r in range(n)]
+
+    def _solve_propagated(self, grid: List[List[int]], start: float,
+                          budget: Optional[Budget]) -> Optional[List[List[int]]]:
+        n = self.n
+        cand = propagate(grid)
+        open_cells = [cell for cell, m in enumerate(cand) if m & (m-1)] if cand is not None else []
+        model = None
+        if not open_cells:
+            self._record(True, 0)
+            self.last_status = SAT if cand is not None else UNSAT
+            encoded = solved = time.perf_counter()
+        else:
+            # The warm solver finishes the grid: decided cells and eliminated candidates become assumptions.
+            assumptions = [cell*n + v + 1 if m == 1 << v else -(cell*n + v + 1)
+                           for cell, m in enumerate(cand) for v in range(n) if m == 1 << v or not m >> v & 1]
+            self._record(False, sum(bin(cand[cell]).count('1') for cell in open_cells))
+            encoded = time.perf_counter()
+            model = self._sat_call(assumptions, budget)
+            solved = time.perf_counter()
+            if model is None:
+                cand = None
+        if cand is not None:
+            for cell in open_cells:
+                for v in range(n):
+                    if cand[cell] >> v & 1 and model[cell*n + v] > 0:
+                        cand[cell] = 1 << v
+                        break
+            values = [m.bit_length() for m in cand]
+            grid = [values[r*n:(r+1)*n] for r in range(n)]
+        else:
+            grid = None
+        self._timings(start, encoded, solved)
+        return grid
+
+    def new_var(self) -> int:
+        """Allocates a fresh variable above the cell variables."""
+        self.top += 1
+        return self.top
+
+    def count_solutions(self, grid: List[List[int]], limit: int = 2) -> int:
+        """
+        Counts the solutions of a puzzle, stopping once `limit` are found.
+
+        Runs on the warm solver: every model found is excluded by a blocking
+        clause over the cell variables, guarded by a fresh selector literal
+        that is assumed during the count and disabled for good afterwards, so
+        later calls see the plain rule formula again.
+        """
+        givens = self.assumptions(grid)
+        selector = self.new_var()
+        count = 0
+        while count < limit and self.solver.solve(assumptions=givens + [selector]):
+            count += 1
+            model = self.solver.get_model()
+            self.solver.add_clause([-selector] + [-lit for lit in model[:self.n**3] if lit > 0])
+        self.solver.add_clause([-selector])
+        return count
+
+    def is_unique(self, grid: List[List[int]]) -> bool:
+        """True when the puzzle has exactly one solution."""
+        return self.count_solutions(grid, limit=2) == 1
+
+    def delete(self):
+        self.solver.delete()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.delete()
+
+
+_engines = {}
+
+# Set to a FormulaCache to have the module wide engines load their rule formulas from disk.
+formula_cache: Optional[FormulaCache] = None
+
+
+def get_engine(n: int = 9) -> SudokuSolver:
+    """Returns the module wide engine for n x n grids, creating it on first use."""
+    engine = _engines.get(n)
+    if engine is None:
+        engine = _engines[n] = SudokuSolver(n, formula_cache=formula_cache)
+    return engine
+
+
+def count_solutions(grid: List[List[int]], limit: int = 2) -> int:
+    """Number of solutions of a puzzle, capped at limit."""
+    return get_engine(len(grid)).count_solutions(grid, limit)
+
+
+def is_unique(grid: List[List[int]]) -> bool:
+    """True when the puzzle has exactly one solution."""
+    return get_engine(len(grid)).is_unique(grid)
+
+
+class SudokuResult(NamedTuple):
+    """
+    Outcome of one puzzle in a batch: its input position, 'SAT'/'UNSAT'/'UNKNOWN'/'ERROR',
+    the solution and the engine's per-puzzle statistics.
+    """
+    index: int
+    status: str
+    grid: Optional[List[List[int]]]
+    stats: dict = {}
+
+
+def _solve_indexed(item, budget: Optional[Budget] = None) -> SudokuResult:
+    index, grid = item
+    try:
+        engine = get_engine(len(grid))
+        solved = engine.solve(grid, budget)
+    except (TypeError, ValueError) as e:
+        # One malformed puzzle must not stop the rest of the batch.
+        return SudokuResult(index, 'ERROR', None, {'error': str(e)})
+    return SudokuResult(index, engine.last_status, solved, engine.last_stats)
+
+
+def solve_sudoku_batch(puzzles: Iterable[List[List[int]]], workers: Optional[int] = None,
+                       chunksize: int = 64, ordered: bool = True,
+                       budget: Optional[Budget] = None) -> Iterator[SudokuResult]:
+    """
+    Solves many puzzles, fanning them out over a process pool.
+
+    Every worker process keeps its own pre-encoded engine per grid size, so the
+    rules are encoded once per process rather than once per puzzle. Results are
+    yielded lazily, either in input order or, with ordered=False, as soon as
+    each chunk finishes; `SudokuResult.index` always refers to the input
+    position. workers defaults to the number of CPUs, and workers=1 solves in
+    the calling process. `budget` applies to each puzzle separately; puzzles
+    that exceed it come back with status 'UNKNOWN', and malformed ones with
+    'ERROR' and the reason in stats['error'].
+    """
+    workers = workers or os.cpu_count() or 1
+    items = enumerate(puzzles)
+    solve = functools.partial(_solve_indexed, budget=budget)
+    if workers == 1:
+        yield from map(solve, items)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        yield from imap(solve, items, chunksize)
+
+
+# Per-process cache for callers that expect repeated puzzles, e.g. pass
+# cache=solution_cache to solve_sudoku. It is off by default: canonicalizing
+# costs more than a warm SAT call, so a miss is slower than no cache at all.
+solution_cache = SolutionCache()
+
+
+def solve_sudoku_result(grid: List[List[int]], budget: Optional[Budget] = None,
+                        cache: Optional[SolutionCache] = None) -> SudokuResult:
+    """
+    Solves one puzzle within `budget` and reports how it went.
+
+    The status is 'SAT', 'UNSAT', 'UNKNOWN' (budget exhausted) or 'ERROR'
+    (malformed grid). Stats are the engine's per-puzzle statistics, including
+    the solver counters of the SAT call; they are empty for cache hits.
+    Exhausted puzzles are never stored in the cache.
+    """
+    stats = {}
+
+    def solve(puzzle):
+        engine = get_engine(len(puzzle))
+        solved = engine.solve(puzzle, budget)
+        stats.update(engine.last_stats)
+        if engine.last_status == UNKNOWN:
+            raise BudgetExhausted
+        return solved
+
+    try:
+        check_grid(grid)
+        solved = cached_solve(grid, cache, solve) if cache is not None else solve(grid)
+    except BudgetExhausted:
+        return SudokuResult(0, UNKNOWN, None, stats)
+    except (TypeError, ValueError) as e:
+        return SudokuResult(0, 'ERROR', None, {'error': str(e)})
+    return SudokuResult(0, SAT if solved is not None else UNSAT, solved, stats)
+
+
+def solve_sudoku(grid: List[List[int]], cache: Optional[SolutionCache] = None,
+                 budget: Optional[Budget] = None) -> List[List[int]]:
+    """
+    Solves a Sudoku puzzle using a SAT solver. Input is a 2D grid with 0s for blanks.
+
+    Returns a new grid (the input is left untouched), or None when the puzzle
+    has no solution. When `budget` runs out first it raises
+    satkit.budget.BudgetExhausted; solve_sudoku_result reports UNKNOWN
+    instead. The grid size is inferred from the input, so 16x16, 25x25 and
+    36x36 puzzles are accepted as well as the classic 9x9. With a `cache`
+    (such as solution_cache) the puzzle is first looked up by its
+    symmetry-canonical form, before any CNF is built; see cache.py.
+    """
+    result = solve_sudoku_result(grid, budget, cache)
+    if result.status == 'ERROR':
+        raise ValueError(result.stats['error'])
+    if result.status == UNKNOWN:
+        raise BudgetExhausted
+    return result.grid
+
+
+def solve_grid(grid: Grid, cache: Optional[SolutionCache] = None,
+               budget: Optional[Budget] = None) -> Optional[Grid]:
+    """
+    Compact form of solve_sudoku: takes and returns a Grid.
+
+    Without a cache the puzzle goes to the engine as flat cell values and
+    the solution is read straight off the model, with no lists in between.
+    """
+    if cache is not None:
+        # The cache works on rows.
+        solved = solve_sudoku(grid.to_rows(), cache, budget)
+        return Grid.from_rows(solved) if solved is not None else None
+    engine = get_engine(grid.n)
+    values = engine.solve_values(grid.values(), budget)
+    if engine.last_status == UNKNOWN:
+        raise BudgetExhausted
+    return Grid.from_values(values, grid.n) if values is not None else None
@@ -1,65 +1,47 @@
-import hashlib
-import math
-import os
-import csv
-from q1 import solve_sudoku
+from q1 import solution_cache, solve_sudoku, solve_sudoku_batch
+from corpus import iter_puzzles, reservoir_sample
 from typing import List
+import numpy as np
+from validate import validate_batch
 from tqdm import tqdm
-import random
 
+# Puzzles of the sample that are also solved one by one through solve_sudoku.
+DIRECT_CHECKS = 20
 
-def is_valid_sudoku(original:List[List[int]], grid: List[List[int]]) -> bool:
-    
-    n=len(grid)
-    sqrt_n = int(math.sqrt(n))
-    if sqrt_n * sqrt_n != n:
-        raise ValueError("Grid size is not square with square subgrids.")
 
-    def check_unique(values):
-        nums = [v for v in values if v != 0]
-        return len(set(nums)) == len(nums)
+def is_valid_sudoku(original: List[List[int]], grid: List[List[int]]) -> bool:
+    """Single-grid form of validate.validate_batch."""
+    return not validate_batch(np.array([grid]), np.array([original]))[0]
 
-    for i in range(n):
-        if not check_unique(grid[i]) or not check_unique([grid[j][i] for j in range(n)]):
-            return False
 
-    for br in range(0, n, sqrt_n):
-        for bc in range(0, n, sqrt_n):
-            block = [grid[r][c] for r in range(br, br + sqrt_n) for c in range(bc, bc + sqrt_n)]
-            if not check_unique(block):
-                return False
-    return True
+def main():
+    # Stream the corpus and keep a uniform sample of 500 9x9 puzzles, the same one every run
+    puzzles = reservoir_sample(iter_puzzles('testcases'), 500, seed=0)
 
+    givens = np.array(puzzles, dtype=np.int16).reshape(-1, 9, 9)
+    solutions = np.zeros_like(givens)
 
-puzzles = []
+    results = solve_sudoku_batch(puzzles)
+    for result in tqdm(results, total=len(puzzles), desc="Solving puzzles"):
+        if result.status == 'SAT':
+            solutions[result.index] = result.grid
 
-with open('testcases', 'r') as f:
-    lines = f.readlines()
+    # Check solve_sudoku itself on a fixed subset, through the symmetry cache
+    direct = np.zeros_like(givens[:DIRECT_CHECKS])
+    for i, puzzle in enumerate(puzzles[:DIRECT_CHECKS]):
+        solved = solve_sudoku(puzzle, cache=solution_cache)
+        if solved is not None:
+            direct[i] = solved
 
-# Filter valid lines of length 81
-valid_lines = [line.strip() for line in lines if len(line.strip()) == 81]
-
-# Randomly sample 500 lines without replacement
-sampled_lines = random.sample(valid_lines, min(500, len(valid_lines)))
-
-# Convert each line to a 9x9 grid
-for line in sampled_lines:
-    grid = [
-        [int(c) if c.isdigit() else 0 for c in line[i*9:(i+1)*9]]
-        for i in range(9)
-    ]
-    puzzles.append(grid)
-
-
-
-passed = 0
-
-for i, puzzle in enumerate(tqdm(puzzles, desc="Solving puzzles")):
-    solved = solve_sudoku(puzzle)
-    if is_valid_sudoku(puzzle, solved):
-        passed += 1
-    else:
+    # Validate every solution at once; unsolved puzzles keep an all-zero grid and fail
+    failed = validate_batch(solutions, givens)
+    failed[:DIRECT_CHECKS] |= validate_batch(direct, givens[:DIRECT_CHECKS])
+    for i in np.flatnonzero(failed):
         print(f"❌ Test case {i + 1} failed!")
+    passed = len(puzzles) - int(failed.sum())
+
+    print(f"\n✅ {passed}/{len(puzzles)} test cases passed.")
 
-print(f"\n✅ {passed}/{len(puzzles)} test cases passed.")
 
+if __name__ == "__main__":
+    main()
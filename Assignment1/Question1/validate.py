@@ -0,0 +1,41 @@
+"""
+validate.py
+
+Vectorized validation of solved Sudoku grids with NumPy.
+"""
+
+import math
+
+import numpy as np
+
+
+def validate_batch(solutions, givens) -> np.ndarray:
+    """
+    Checks a batch of solutions against the rules and their puzzles.
+
+    Args:
+        solutions: (B, n, n) integer array of filled grids.
+        givens: (B, n, n) integer array of the original puzzles, 0 for blanks.
+
+    Returns:
+        (B,) boolean array, True where a solution is invalid: some row, column
+        or box is not a permutation of 1..n, or a given was changed.
+    """
+    solutions = np.asarray(solutions)
+    givens = np.asarray(givens)
+    if solutions.ndim != 3 or solutions.shape[1] != solutions.shape[2]:
+        raise ValueError("Expected solutions of shape (B, n, n).")
+    if givens.shape != solutions.shape:
+        raise ValueError("givens and solutions must have the same shape.")
+    batch, n, _ = solutions.shape
+    b = math.isqrt(n)
+    if b * b != n:
+        raise ValueError("Grid size is not square with square subgrids.")
+
+    digits = np.arange(1, n + 1)
+    boxes = solutions.reshape(batch, b, b, b, b).transpose(0, 1, 3, 2, 4).reshape(batch, n, n)
+    failed = np.zeros(batch, dtype=bool)
+    for units in (solutions, solutions.transpose(0, 2, 1), boxes):
+        failed |= (np.sort(units, axis=2) != digits).any(axis=(1, 2))
+    failed |= ((givens != 0) & (givens != solutions)).any(axis=(1, 2))
+    return failed
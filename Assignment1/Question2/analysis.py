@@ -0,0 +1,139 @@
+"""
+analysis.py
+
+Static analysis of a Sokoban level, run before encoding.
+
+All functions take the open (non-wall) cells of a level as a set of (y, x)
+positions and ignore the other boxes, so what they report is an
+over-approximation of what can happen: a cell they call unreachable
+really is unreachable, in any plan.
+"""
+
+from collections import deque
+from math import inf
+
+MOVES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def player_distances(cells, start):
+    """Fewest moves the player needs from `start` to each reachable cell."""
+    dist = {start: 0}
+    queue = deque([start])
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in MOVES:
+            nxt = (y+dy, x+dx)
+            if nxt in cells and nxt not in dist:
+                dist[nxt] = dist[(y, x)] + 1
+                queue.append(nxt)
+    return dist
+
+
+def live_squares(cells, goals):
+    """
+    Cells from which a lone box can still be pushed onto some goal.
+
+    Computed backwards from the goals: a box on c can be pushed onto e = c+d
+    when the player can stand on c-d. Every other cell is a dead square, for
+    example a corner or a stretch along a wall without a goal.
+    """
+    live = set(goals)
+    queue = deque(goals)
+    while queue:
+        ey, ex = queue.popleft()
+        for dy, dx in MOVES:
+            c = (ey-dy, ex-dx)
+            if c in cells and c not in live and (c[0]-dy, c[1]-dx) in cells:
+                live.add(c)
+                queue.append(c)
+    return live
+
+
+def push_distances(cells, sources, allowed=None):
+    """
+    Fewest pushes that bring some box from `sources` onto each cell, moving
+    only through `allowed` cells (all cells by default).
+    """
+    allowed = cells if allowed is None else allowed
+    dist = {c: 0 for c in sources if c in allowed}
+    queue = deque(dist)
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in MOVES:
+            nxt = (y+dy, x+dx)
+            if nxt in allowed and nxt not in dist and (y-dy, x-dx) in cells:
+                dist[nxt] = dist[(y, x)] + 1
+                queue.append(nxt)
+    return dist
+
+
+def min_cost_matching(costs):
+    """
+    Smallest total cost of giving every row of `costs` its own column
+    (Hungarian algorithm, O(rows^2 * columns)); inf when no assignment of
+    finite cost exists.
+    """
+    rows = len(costs)
+    if rows == 0:
+        return 0
+    cols = len(costs[0])
+    if rows > cols:
+        return inf
+    # Stand-in for inf that keeps the potentials finite: any assignment using it costs more than all others.
+    big = sum(c for row in costs for c in row if c != inf) + 1
+    a = [[big if c == inf else c for c in row] for row in costs]
+    u, v = [0] * (rows+1), [0] * (cols+1)
+    match, way = [0] * (cols+1), [0] * (cols+1)
+    for i in range(1, rows+1):
+        match[0], j0 = i, 0
+        minv, used = [inf] * (cols+1), [False] * (cols+1)
+        while match[j0]:
+            used[j0] = True
+            i0, delta, j1 = match[j0], inf, 0
+            for j in range(1, cols+1):
+                if not used[j]:
+                    cur = a[i0-1][j-1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(cols+1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    total = sum(a[match[j]-1][j-1] for j in range(1, cols+1) if match[j])
+    return inf if total >= big else total
+
+
+def reported_bound(bound):
+    """A bound as stats report it: None for inf, which JSON cannot hold."""
+    return None if bound == inf else bound
+
+
+def lower_bounds(cells, player, boxes, goals, live=None):
+    """
+    Admissible lower bounds (pushes, moves) on any plan that leaves every box on a goal.
+
+    Each push moves one box one cell, so the boxes need at least the cheapest
+    matching of boxes to distinct goals under push distances. Unless every
+    box already stands on a goal, the player also has to walk behind some
+    box before the first push. Both are inf when the level is unsolvable.
+    """
+    if player is None:
+        return inf, inf
+    live = live_squares(cells, goals) if live is None else live
+    pushes = min_cost_matching([[push_distances(cells, [box], live).get(goal, inf) for goal in goals]
+                                for box in boxes])
+    if pushes in (0, inf):
+        return pushes, pushes
+    reach = player_distances(cells, player)
+    walk = min((reach[(y-dy, x-dx)] for (y, x) in boxes for dy, dx in MOVES
+                if (y-dy, x-dx) in reach and (y+dy, x+dx) in cells), default=inf)
+    return pushes, pushes + walk
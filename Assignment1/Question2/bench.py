@@ -0,0 +1,97 @@
+"""
+bench.py
+
+Benchmarks for the Sokoban encoder.
+
+    python bench.py amo --seed 0 --count 6 --sizes 8 12 20
+
+compares the at-most-one encodings of q2 (AMO_ENCODINGS) for the player
+position on the levels in input/ and on seeded random boards of the given
+sizes, reporting variables, clauses, encode time and solve time for each.
+Every level is encoded and solved once per encoding on a fresh g3 solver at
+the level's T (random boards use rows + columns), so the encodings see the
+same formulas apart from the at-most-one constraints. DEFAULT_AMO in q2 is
+chosen from this table; the defaults run in about two minutes, and larger
+sizes mostly add pairwise and totalizer encode time.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import time
+
+from pysat.solvers import Solver
+
+from crosscheck import random_level
+from q2 import AMO_ENCODINGS, SokobanEncoder, decode
+from satkit.budget import SAT, solve_budgeted
+from tester import parse_input
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def benchmark_levels(rng, count, sizes, boxes=3):
+    """(name, grid, T) for every level in input/ and `count` random boards of each size."""
+    for path in sorted(glob.glob(os.path.join(HERE, 'input', '*.txt'))):
+        grid, T = parse_input(path)
+        yield os.path.basename(path), grid, T
+    for size in sizes:
+        made = 0
+        while made < count:
+            grid = random_level(rng, size, size, rng.randint(1, boxes))
+            if grid is not None:
+                made += 1
+                yield f"random {size}x{size}", grid, 2 * size
+
+
+def bench_amo(levels, encodings=AMO_ENCODINGS, solver_name='g3'):
+    """Yields one row of measurements per at-most-one encoding for the given levels."""
+    for amo in encodings:
+        row = {'amo': amo, 'vars': 0, 'clauses': 0, 'encode_s': 0.0, 'solve_s': 0.0, 'sat': 0}
+        for _, grid, T in levels:
+            start = time.perf_counter()
+            encoder = SokobanEncoder([r[:] for r in grid], T, amo)
+            cnf = encoder.encode()
+            row['encode_s'] += time.perf_counter() - start
+            row['vars'] += cnf.nv
+            row['clauses'] += len(cnf.clauses)
+            with Solver(name=solver_name, bootstrap_with=cnf.clauses) as solver:
+                status, stats = solve_budgeted(solver, solver_name)
+                if status == SAT:
+                    # decode prints the plan; reading it off is part of the solve.
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        decode(solver.get_model(), encoder)
+            row['solve_s'] += stats['time_s']
+            row['sat'] += status == SAT
+        yield row
+
+
+def _print_table(rows):
+    header = f"{'amo':<12}{'vars':>11}{'clauses':>12}{'encode s':>10}{'solve s':>10}{'total s':>10}{'sat':>6}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['amo']:<12}{row['vars']:>11}{row['clauses']:>12}{row['encode_s']:>10.3f}"
+              f"{row['solve_s']:>10.3f}{row['encode_s'] + row['solve_s']:>10.3f}{row['sat']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sokoban encoder benchmarks.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    amo = sub.add_parser('amo', help="compare player at-most-one encodings on input/ and random boards")
+    amo.add_argument('--seed', type=int, default=0)
+    amo.add_argument('--count', type=int, default=6, help="random boards per size")
+    amo.add_argument('--sizes', type=int, nargs='*', default=[8, 12, 20])
+    amo.add_argument('--solver', default='g3')
+    amo.add_argument('--encodings', nargs='+', default=list(AMO_ENCODINGS), choices=AMO_ENCODINGS)
+
+    args = parser.parse_args()
+    if args.command == 'amo':
+        levels = list(benchmark_levels(random.Random(args.seed), args.count, args.sizes))
+        print(f"{len(levels)} levels: input/ and {args.count} random boards of each size {args.sizes} "
+              f"(seed {args.seed})")
+        _print_table(bench_amo(levels, args.encodings, args.solver))
@@ -0,0 +1,194 @@
+"""
+crosscheck.py
+
+Seeded cross-checks of the Sokoban search helpers against brute force.
+
+    python crosscheck.py bounds --seed 0 --count 600
+    python crosscheck.py oracle --seed 0 --count 1200
+    python crosscheck.py encodings --seed 0 --count 400
+
+`bounds` checks analysis.min_cost_matching against every assignment of random cost
+matrices, and analysis.lower_bounds against the fewest moves the tester's
+oracle needs on random levels: the UNSAT early exit of solve_sokoban_result
+is only sound while the bound never exceeds that optimum. `oracle` checks
+tester.is_sokoban_solvable against a plain move-by-move BFS over (player,
+boxes) states, for several T per level. `encodings` runs every Sokoban search
+(solve_sokoban_result with each AMO encoding, solve_sokoban_incremental and
+solve_sokoban_pushes) against the same BFS and replays each plan with
+tester.verify_solution. The exit status is 1 when any check fails.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import random
+import sys
+from collections import deque
+from math import inf
+
+from analysis import lower_bounds, min_cost_matching
+from pushes import solve_sokoban_pushes
+from q2 import AMO_ENCODINGS, solve_sokoban_incremental, solve_sokoban_result
+from tester import SAT, UNSAT, is_sokoban_solvable, verify_solution
+
+
+def random_level(rng, rows, cols, boxes, walls=0.15):
+    """A random level with one player and `boxes` boxes and goals, or None if it does not fit."""
+    grid = [['#' if rng.random() < walls else '.' for _ in range(cols)] for _ in range(rows)]
+    free = [(i, j) for i in range(rows) for j in range(cols) if grid[i][j] == '.']
+    if len(free) < 2*boxes + 1:
+        return None
+    rng.shuffle(free)
+    for (i, j), c in zip(free, 'P' + 'B'*boxes + 'G'*boxes):
+        grid[i][j] = c
+    return grid
+
+
+def fewest_moves(grid, limit):
+    """Smallest T for which the oracle finds a plan, None if there is none up to limit."""
+    return next((T for T in range(limit+1) if is_sokoban_solvable(grid, T) != UNSAT), None)
+
+
+def reference_solvable(grid, T):
+    """SAT/UNSAT by breadth-first search over every (player, boxes) state reachable in T moves."""
+    cells = {(i, j) for i, row in enumerate(grid) for j, c in enumerate(row) if c != '#'}
+    find = lambda ch: {(i, j) for i, row in enumerate(grid) for j, c in enumerate(row) if c == ch}
+    goals = find('G')
+    start = (next(iter(find('P'))), frozenset(find('B')))
+    seen = {start}
+    queue = deque([(start, 0)])
+    while queue:
+        (player, boxes), steps = queue.popleft()
+        if boxes <= goals:
+            return SAT
+        if steps == T:
+            continue
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nxt = (player[0]+dy, player[1]+dx)
+            if nxt not in cells:
+                continue
+            if nxt in boxes:
+                ahead = (nxt[0]+dy, nxt[1]+dx)
+                if ahead not in cells or ahead in boxes:
+                    continue
+                state = (nxt, boxes - {nxt} | {ahead})
+            else:
+                state = (nxt, boxes)
+            if state not in seen:
+                seen.add(state)
+                queue.append((state, steps + 1))
+    return UNSAT
+
+
+def check_oracle(rng, count):
+    failures = checked = 0
+    for _ in range(count):
+        grid = random_level(rng, rng.randint(2, 7), rng.randint(2, 7), rng.randint(0, 3), walls=0.2)
+        if grid is None:
+            continue
+        for T in (0, 1, 3, 6, 10, 15):
+            checked += 1
+            expected, got = reference_solvable(grid, T), is_sokoban_solvable(grid, T)
+            if got != expected:
+                print(f"T={T}: oracle {got}, reference BFS {expected}:")
+                print('\n'.join(''.join(row) for row in grid))
+                failures += 1
+    print(f"oracle: {checked} (level, T) pairs")
+    return failures
+
+
+def searches():
+    """(name, search) for every Sokoban search; each takes (grid, T) and returns a SokobanResult."""
+    for amo in AMO_ENCODINGS:
+        yield f"result/{amo}", lambda grid, T, amo=amo: solve_sokoban_result(grid, T, amo=amo)
+    yield 'incremental', solve_sokoban_incremental
+    yield 'pushes', solve_sokoban_pushes
+
+
+def check_encodings(rng, count):
+    failures = checked = 0
+    for _ in range(count):
+        grid = random_level(rng, rng.randint(2, 7), rng.randint(2, 7), rng.randint(0, 3), walls=0.2)
+        if grid is None:
+            continue
+        for T in (0, 1, 3, 6, 10, 15):
+            checked += 1
+            expected = 'SAT' if reference_solvable(grid, T) == SAT else 'UNSAT'
+            for name, search in searches():
+                # decode prints the plan it reads off a model.
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = search([row[:] for row in grid], T)
+                if result.status != expected:
+                    problem = f"{result.status}, reference BFS {expected}"
+                elif expected == 'SAT' and not verify_solution([row[:] for row in grid], result.moves, T):
+                    problem = f"plan {''.join(result.moves)} does not solve the level"
+                else:
+                    continue
+                print(f"{name} T={T}: {problem}:")
+                print('\n'.join(''.join(row) for row in grid))
+                failures += 1
+    print(f"encodings: {checked} (level, T) pairs, {checked * len(list(searches()))} searches")
+    return failures
+
+
+def check_matching(rng, count):
+    failures = 0
+    for _ in range(count):
+        rows = rng.randint(0, 4)
+        cols = rng.randint(rows, 5) if rows else 0
+        costs = [[rng.choice([inf] + list(range(9))) for _ in range(cols)] for _ in range(rows)]
+        brute = min((sum(costs[i][p[i]] for i in range(rows)) for p in itertools.permutations(range(cols), rows)),
+                    default=inf) if rows else 0
+        if min_cost_matching(costs) != brute:
+            print(f"min_cost_matching({costs}) = {min_cost_matching(costs)}, brute force {brute}")
+            failures += 1
+    return failures
+
+
+def check_bounds(rng, count, limit):
+    failures = tight = solved = 0
+    for _ in range(count):
+        grid = random_level(rng, rng.randint(2, 8), rng.randint(2, 8), rng.randint(1, 3))
+        if grid is None:
+            continue
+        cells = {(i, j) for i, row in enumerate(grid) for j, c in enumerate(row) if c != '#'}
+        find = lambda ch: [(i, j) for i, row in enumerate(grid) for j, c in enumerate(row) if c == ch]
+        _, bound = lower_bounds(cells, find('P')[0], find('B'), find('G'))
+        optimum = fewest_moves(grid, limit)
+        if optimum is None:
+            continue
+        solved += 1
+        tight += bound == optimum
+        if bound > optimum:
+            print(f"lower bound {bound} > optimum {optimum}:")
+            print('\n'.join(''.join(row) for row in grid))
+            failures += 1
+    print(f"bounds: {solved} solvable levels, bound equal to the optimum on {tight}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seeded cross-checks of the Sokoban helpers.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    bounds = sub.add_parser('bounds', help="matching and lower bounds against brute force and the oracle")
+    bounds.add_argument('--seed', type=int, default=0)
+    bounds.add_argument('--count', type=int, default=600)
+    bounds.add_argument('--limit', type=int, default=15, help="largest optimum searched for")
+    oracle = sub.add_parser('oracle', help="tester oracle against a plain move-by-move BFS")
+    oracle.add_argument('--seed', type=int, default=0)
+    oracle.add_argument('--count', type=int, default=1200)
+    encodings = sub.add_parser('encodings', help="every Sokoban search against a plain move-by-move BFS")
+    encodings.add_argument('--seed', type=int, default=0)
+    encodings.add_argument('--count', type=int, default=400)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.command == 'bounds':
+        failures = check_matching(rng, 4 * args.count) + check_bounds(rng, args.count, args.limit)
+    elif args.command == 'oracle':
+        failures = check_oracle(rng, args.count)
+    else:
+        failures = check_encodings(rng, args.count)
+    print(f"{failures} failures")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,271 @@
+"""
+pushes.py
+
+Push-level Sokoban encoding: one layer per box push instead of per move.
+
+Between two pushes the player may walk any distance, so a layer only has to
+say where the boxes are, where the player stands (on the cell the last
+pushed box left) and which cells the player can walk to. Those reachability
+variables R(c, k) are only required to be *supported*: R(c, k) needs the
+player on c or a reachable neighbour, and no box on c. That still allows
+cycles of cells that support each other while the player is walled off by
+boxes, so every model is checked against a real BFS and each unreachable
+push adds a loop clause and the solver is called again.
+
+A plan with the fewest pushes is expanded into U/D/L/R moves with shortest
+walks between the pushes. It can still be longer than a plan with more
+pushes and less walking, so when it does not fit into T moves the solver
+falls back to the move-level encoding of q2.
+"""
+
+import time
+from collections import deque
+from typing import NamedTuple
+
+from pysat.card import CardEnc, EncType
+from pysat.solvers import Solver
+
+from analysis import MOVES, player_distances, reported_bound
+from q2 import DEFAULT_AMO, DIRS, SokobanEncoder, SokobanResult, solve_sokoban_result
+from satkit.budget import SAT, UNKNOWN, UNSAT, exhausted, remaining, solve_budgeted
+
+MOVE_NAMES = {d: name for name, d in DIRS.items()}
+
+
+class PushLayer(NamedTuple):
+    """Variable IDs of one push layer; `end` is the largest ID it uses."""
+    reach: dict
+    player: dict
+    box: dict
+    push: dict
+    amo: list
+    goal: int
+    end: int
+
+
+class PushEncoder(SokobanEncoder):
+    """
+    Layer k is the state after k pushes; step k pushes exactly one box.
+
+    Shares the grid parsing, the static analysis and the FALSE constant with
+    SokobanEncoder; T is the largest number of pushes. The inherited encode()
+    builds the formula for exactly T pushes. Its models may still walk
+    through walled-off cells, so check them with refine() before expand().
+    """
+
+    def _allocate(self, k):
+        top = self.layers[-1].end if self.layers else self.FALSE
+
+        def number(keys):
+            nonlocal top
+            ids = {key: top + 1 + n for n, key in enumerate(keys)}
+            top += len(ids)
+            return ids
+
+        box_at = lambda c, k: self.box_dist.get(c, k+1) <= k
+        reach = number([c for c in self.cells if c in self.player_dist])
+        # The player starts a layer on the cell the previous push freed.
+        if k == 0:
+            player = number([self.player_start] if self.player_start else [])
+        else:
+            player = number(sorted({c for c, _ in self.layers[k-1].push}))
+        box = number([c for c in self.cells if box_at(c, k)])
+        push = number([((i, j), (dy, dx)) for (i, j) in box for (dy, dx) in MOVES
+                       if (i-dy, j-dx) in reach and box_at((i+dy, j+dx), k+1)])
+        amo = CardEnc.atmost(lits=list(push.values()), bound=1, top_id=top, encoding=getattr(EncType, self.amo))
+        top = max(top, amo.nv)
+        goal = top + 1
+        return PushLayer(reach, player, box, push, amo.clauses, goal, goal)
+
+    def var_reach(self, y, x, k):
+        """Variable ID for the player being able to walk to (x, y) after k pushes."""
+        return self.layer(k).reach.get((y, x), self.FALSE)
+
+    def _reach_clauses(self, out, k):
+        """R(c, k) needs a free cell and the player on it or on a reachable neighbour."""
+        for (i, j) in self.layer(k).reach:
+            self._add(out, [-self.var_reach(i, j, k), -self.var_box(i, j, k)])
+            self._add(out, [-self.var_reach(i, j, k), self.var_player(i, j, k)]
+                      + [self.var_reach(i+dy, j+dx, k) for (dy, dx) in MOVES])
+
+    def initial_clauses(self):
+        """Constant FALSE, the starting position and reachability after 0 pushes."""
+        out = [[-self.FALSE]]
+        for (i, j) in self.boxes:
+            self._add(out, [self.var_box(i, j, 0)])
+        self._add(out, [self.var_player(*self.player_start, 0)] if self.player_start else [])
+        self._reach_clauses(out, 0)
+        return out
+
+    def step_clauses(self, k):
+        """Clauses for push k, which turns layer k into layer k+1."""
+        out = []
+        now, nxt = self.layer(k), self.layer(k+1)
+        # Exactly one push per step.
+        self._add(out, list(now.push.values()))
+        out.extend(now.amo)
+        # The player walks behind the box and pushes it into a free cell,
+        # ending up where the box was.
+        for (c, d), push in now.push.items():
+            (i, j), (dy, dx) = c, d
+            for lit in (self.var_reach(i-dy, j-dx, k), self.var_box(i, j, k), -self.var_box(i+dy, j+dx, k),
+                        self.var_player(i, j, k+1), -self.var_box(i, j, k+1), self.var_box(i+dy, j+dx, k+1)):
+                self._add(out, [-push, lit])
+        for (i, j) in nxt.player:
+            self._add(out, [-self.var_player(i, j, k+1)] + [self.var_push(i, j, d, k) for d in MOVES])
+        # Explanatory frame axioms: a box only leaves or reaches a cell through a push.
+        for (i, j) in now.box:
+            self._add(out, [-self.var_box(i, j, k), self.var_box(i, j, k+1)]
+                      + [self.var_push(i, j, d, k) for d in MOVES])
+        for (i, j) in nxt.box:
+            self._add(out, [self.var_box(i, j, k), -self.var_box(i, j, k+1)]
+                      + [self.var_push(i-dy, j-dx, (dy, dx), k) for (dy, dx) in MOVES])
+        self._reach_clauses(out, k+1)
+        return out
+
+    # ---------------- Model checking ----------------
+    def plan(self, model, horizon):
+        """The pushes of a model as (cell, direction) pairs, with the boxes before each push."""
+        true = lambda var: var <= len(model) and model[var-1] > 0
+        steps = []
+        for k in range(horizon):
+            boxes = {c for c in self.layer(k).box if true(self.layer(k).box[c])}
+            push = next(key for key, var in self.layer(k).push.items() if true(var))
+            steps.append((boxes, push))
+        return steps
+
+    def refine(self, model, horizon):
+        """
+        Loop clauses for the pushes of a model that the player cannot
+        actually reach; an empty list when the whole plan is valid.
+
+        If b is claimed reachable in layer k but is not, the cells U that
+        are claimed reachable in that layer without being so, connected to
+        b, only support each other. b can then only be reachable if the
+        player stands in U or some neighbour of U outside it is reachable,
+        which the model violates.
+        """
+        true = lambda var: var <= len(model) and model[var-1] > 0
+        open_cells = set(self.cells)
+        player = self.player_start
+        cuts = []
+        for k, (boxes, ((i, j), (dy, dx))) in enumerate(self.plan(model, horizon)):
+            behind = (i-dy, j-dx)
+            walkable = player_distances(open_cells - boxes, player)
+            if behind not in walkable:
+                claimed = {c for c, var in self.layer(k).reach.items() if true(var)} - set(walkable)
+                loop, queue = {behind}, deque([behind])
+                while queue:
+                    y, x = queue.popleft()
+                    for my, mx in MOVES:
+                        n = (y+my, x+mx)
+                        if n in claimed and n not in loop:
+                            loop.add(n)
+                            queue.append(n)
+                border = {(y+my, x+mx) for (y, x) in loop for (my, mx) in MOVES} - loop
+                clause = [-self.var_reach(*behind, k)]
+                clause += [self.var_player(y, x, k) for (y, x) in loop]
+                clause += [self.var_reach(y, x, k) for (y, x) in border]
+                self._add(cuts, clause)
+            player = (i, j)
+        return cuts
+
+    def expand(self, model, horizon):
+        """U/D/L/R moves of a valid plan, walking the shortest way to each push."""
+        player = self.player_start
+        moves = []
+        for boxes, ((i, j), d) in self.plan(model, horizon):
+            moves += walk(set(self.cells) - boxes, player, (i-d[0], j-d[1]))
+            moves.append(MOVE_NAMES[d])
+            player = (i, j)
+        return moves
+
+
+def walk(cells, start, target):
+    """Moves along a shortest path from start to target through cells."""
+    parent = {start: None}
+    queue = deque([start])
+    while target not in parent:
+        y, x = queue.popleft()
+        for dy, dx in MOVES:
+            n = (y+dy, x+dx)
+            if n in cells and n not in parent:
+                parent[n] = (y, x)
+                queue.append(n)
+    path = []
+    while parent[target] is not None:
+        prev = parent[target]
+        path.append(MOVE_NAMES[(target[0]-prev[0], target[1]-prev[1])])
+        target = prev
+    return path[::-1]
+
+
+def solve_sokoban_pushes(grid, T, max_pushes=None, budget=None, solver_name='g3', amo=DEFAULT_AMO):
+    """
+    Solve Sokoban with the fewest pushes, deepening one push layer at a time on one solver.
+
+    Args:
+        grid (list[list[str]]): Sokoban grid.
+        T (int): Max number of moves allowed.
+        max_pushes (int, optional): largest number of pushes to try, T by
+            default (every push is a move).
+        budget (satkit.budget.Budget, optional): limits for the whole search,
+            including a fallback to the move-level encoding.
+        solver_name (str): pysat backend.
+        amo (str): at-most-one encoding of the pushes of a step, see q2.AMO_ENCODINGS.
+
+    Returns:
+        SokobanResult: horizon is the number of pushes; the search starts
+        at the lower bound on it (analysis.lower_bounds). The stats also count
+        the loop clauses added ('refinements') and note whether the
+        move-level encoding had to be used ('fallback').
+    """
+    start = time.perf_counter()
+    max_pushes = T if max_pushes is None else min(T, max_pushes)
+    encoder = PushEncoder(grid, max_pushes, amo)
+    totals = {'encode_s': 0.0, 'time_s': 0.0, 'refinements': 0, 'fallback': False,
+              'lower_bound': reported_bound(encoder.min_moves)}
+    if encoder.min_moves > T:
+        return SokobanResult(UNSAT, None, totals)
+    with Solver(name=solver_name) as solver:
+        for k in range(0, max_pushes+1):
+            encode_start = time.perf_counter()
+            solver.append_formula(encoder.initial_clauses() if k == 0 else encoder.step_clauses(k-1))
+            solver.append_formula(encoder.goal_clauses(k))
+            totals['encode_s'] += time.perf_counter() - encode_start
+            if k < encoder.min_pushes:
+                continue
+
+            while True:
+                left = remaining(budget, time.perf_counter() - start, totals)
+                if exhausted(left):
+                    return SokobanResult(UNKNOWN, None, totals, k)
+                status, stats = solve_budgeted(solver, solver_name, [encoder.var_goal(k)], left)
+                for key, value in stats.items():
+                    totals[key] = totals.get(key, 0) + value
+                if status != SAT:
+                    break
+                model = solver.get_model()
+                cuts = encoder.refine(model, k)
+                if not cuts:
+                    break
+                solver.append_formula(cuts)
+                totals['refinements'] += len(cuts)
+
+            if status == SAT:
+                moves = encoder.expand(model, k)
+                if len(moves) <= T:
+                    return SokobanResult(SAT, moves, totals, k)
+                # Fewest pushes, but too much walking: search over moves instead.
+                totals['fallback'] = True
+                left = remaining(budget, time.perf_counter() - start, totals)
+                if exhausted(left):
+                    return SokobanResult(UNKNOWN, None, totals)
+                result = solve_sokoban_result(grid, T, left, amo=amo)
+                for key, value in result.stats.items():
+                    totals[key] = totals.get(key, 0) + value
+                return SokobanResult(result.status, result.moves, totals)
+            if status != UNSAT:
+                return SokobanResult(status, None, totals, k)
+            solver.add_clause([-encoder.var_goal(k)])
+    return SokobanResult(UNSAT, None, totals)
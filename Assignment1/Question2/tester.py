@@ -1,9 +1,14 @@
 # tester.py
-import sys
-import sys
+import argparse
+import concurrent.futures
+import contextlib
 import glob
+import io
+import json
 import os
-from collections import deque
+import sys
+import time
+import xml.etree.ElementTree as ET
 from q2 import solve_sokoban  # student functions
 
 UNSAT = -1
@@ -84,113 +89,300 @@ def verify_solution(board, moves, T):
 
     return True
 
-def is_sokoban_solvable(grid, T):
-    rows = len(grid)
-    cols = len(grid[0])
-    G = [list(row) for row in grid]
+def _shift(bits, offset):
+    return bits << offset if offset > 0 else bits >> -offset
 
-    # Parse positions
-    player = None
-    boxes = set()
-    goals = set()
-    for i in range(rows):
-        for j in range(cols):
-            c = G[i][j]
-            if c == 'P':
-                player = (i, j)
-                G[i][j] = '.'  # treat as empty for movement
-            elif c == 'B':
-                boxes.add((i, j))
-            elif c == 'G':
-                goals.add((i, j))
-
-    if player is None:
-        raise ValueError("No player found.")
+class _StateTable:
+    """
+    Open-addressing hash table from fixed-width byte keys to small
+    non-negative integers, kept in a single bytearray. A state costs
+    (key + value bytes) / load factor, a few dozen bytes at most, where a
+    set of Python ints needs around a hundred. The all-zero key marks an
+    empty slot and cannot be stored.
+    """
 
-    # Quick checks
-    if not boxes:
-        return True  # trivially satisfied
-    if boxes.issubset(goals):
+    def __init__(self, width, value_bytes=0, capacity=1 << 12):
+        self.width = width
+        self.value_bytes = value_bytes
+        self.slot = width + value_bytes
+        self.empty = bytes(width)
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.mask = capacity - 1
+        self.data = bytearray(capacity * self.slot)
+
+    def _find(self, key):
+        """(offset, found): key's slot, or the empty slot where it would go (linear probing)."""
+        data, slot, empty, mask = self.data, self.slot, self.empty, self.mask
+        i = hash(key) & mask
+        while True:
+            off = i * slot
+            if data.startswith(key, off):
+                return off, True
+            if data.startswith(empty, off):
+                return off, False
+            i = (i + 1) & mask
+
+    def get(self, key):
+        """Value stored for key, None if it is not in the table."""
+        off, found = self._find(key)
+        return int.from_bytes(self.data[off+self.width:off+self.slot], 'little') if found else None
+
+    def put(self, key, value=0):
+        """Stores value for key; returns False, changing nothing, if key already has a value <= value."""
+        off, found = self._find(key)
+        if found:
+            if int.from_bytes(self.data[off+self.width:off+self.slot], 'little') <= value:
+                return False
+        else:
+            if 10 * (self.count + 1) > 7 * (self.mask + 1):
+                self._grow()
+                off, _ = self._find(key)
+            self.count += 1
+        self.data[off:off+self.slot] = key + value.to_bytes(self.value_bytes, 'little')
         return True
 
-    dirs = [(-1,0), (1,0), (0,-1), (0,1)]
-
-    def in_bounds(x, y):
-        return 0 <= x < rows and 0 <= y < cols
-
-    # BFS
-    start_state = (player, frozenset(boxes))
-    q = deque()
-    q.append((player, frozenset(boxes), 0))
-    visited = {start_state}
-
-    while q:
-        ppos, box_set, steps = q.popleft()
-
-        if steps > T:
-            continue
+    def _grow(self):
+        old, slot, width = self.data, self.slot, self.width
+        self._allocate(2 * (self.mask + 1))
+        for off in range(0, len(old), slot):
+            if not old.startswith(self.empty, off):
+                new, _ = self._find(bytes(old[off:off+width]))
+                self.data[new:new+slot] = old[off:off+slot]
 
-        # Goal check
-        if box_set.issubset(goals):
-            return SAT
-
-        px, py = ppos
-        for dx, dy in dirs:
-            nx, ny = px + dx, py + dy
-
-            if not in_bounds(nx, ny):
-                continue
-            if G[nx][ny] == '#':
-                continue
+class _Bitboards:
+    """
+    A level as integer bitboards: cell (i, j) is bit i*W + j, where W leaves
+    one spare column so that no shift wraps from one row into the next.
+    Sets of cells (the open cells, goals, boxes, a walking frontier) are
+    single integers and are moved around with shifts. States are stored
+    packed to a few bytes each (see pack).
+    """
 
-            new_boxes = set(box_set)
-            if (nx, ny) in box_set:
-                # Trying to push box
-                bx, by = nx + dx, ny + dy
-                if not in_bounds(bx, by):
+    def __init__(self, G):
+        self.W = max(len(row) for row in G) + 1
+        # Bit offsets of U, D, L, R.
+        self.offsets = (-self.W, self.W, -1, 1)
+        self.open = self.goals = self.boxes = 0
+        self.player = None
+        for i, row in enumerate(G):
+            for j, c in enumerate(row):
+                bit = 1 << (i*self.W + j)
+                if c == '#':
                     continue
-                if G[bx][by] == '#' or (bx, by) in box_set:
+                self.open |= bit
+                if c == 'P':
+                    self.player = bit
+                elif c == 'B':
+                    self.boxes |= bit
+                elif c == 'G':
+                    self.goals |= bit
+        self.size = (len(G) + 1) * self.W
+        self.live = self._live_cells()
+        # Packed states: the box bitboard from the first open cell on, then the player cell.
+        self.first = (self.open & -self.open).bit_length() - 1
+        self.box_bytes = (self.size - self.first + 7) // 8
+        self.cell_bytes = (self.size.bit_length() + 7) // 8
+
+    def pack(self, boxes, cell):
+        """
+        Fixed-width bytes for a box bitboard and a player cell number; never
+        all zero while there are boxes, so _StateTable can store it.
+        """
+        return (boxes >> self.first).to_bytes(self.box_bytes, 'little') + cell.to_bytes(self.cell_bytes, 'little')
+
+    def unpack(self, key):
+        """Inverse of pack: (boxes bitboard, player cell number)."""
+        return (int.from_bytes(key[:self.box_bytes], 'little') << self.first,
+                int.from_bytes(key[self.box_bytes:], 'little'))
+
+    def _live_cells(self):
+        """
+        Cells from which a lone box can still be pushed onto a goal, found by
+        pulling boxes backwards from the goals. A box on any other cell can
+        never be part of a solution.
+        """
+        live = self.goals
+        while True:
+            # A push along off brings a box from c onto c+off, with the player on c-off.
+            grown = live
+            for off in self.offsets:
+                grown |= _shift(live, -off) & self.open & _shift(self.open, off)
+            if grown == live:
+                return live
+            live = grown
+
+    def grow(self, bits, free):
+        """Cells of `free` next to a cell of `bits`."""
+        W = self.W
+        return (bits << 1 | bits >> 1 | bits << W | bits >> W) & free
+
+    def pushes(self, boxes, standing):
+        """(new boxes, player bit after the push) for every push by a player on a `standing` cell."""
+        target = self.live & ~boxes
+        for off in self.offsets:
+            pushable = boxes & _shift(standing, off) & _shift(target, -off)
+            while pushable:
+                low = pushable & -pushable
+                pushable ^= low
+                yield boxes ^ low ^ _shift(low, off), low
+
+    def fewest_moves(self, T):
+        """
+        Fewest moves that bring the boxes onto goals, or None if that takes more than T.
+
+        Walks between pushes are not states of their own: a state is the box
+        bitboard and the exact player cell right after a push, and states are
+        expanded in order of moves (Dial's algorithm). The walk is a
+        breadth-first search over whole bitboard layers, so every push of the
+        cells at distance t costs t + 1.
+
+        `best` keeps the cheapest known cost of every state, and a state is
+        only queued again when it got strictly cheaper, so each one is
+        expanded once. Both the table and the buckets (bytearrays) hold
+        packed states.
+        """
+        start = self.pack(self.boxes, self.player.bit_length() - 1)
+        width = len(start)
+        best = _StateTable(width, (T.bit_length() + 7) // 8)
+        best.put(start, 0)
+        buckets = {0: bytearray(start)}
+        for moves in range(T+1):
+            if not buckets:
+                break
+            bucket = buckets.pop(moves, b'')
+            for off in range(0, len(bucket), width):
+                key = bytes(bucket[off:off+width])
+                if best.get(key) < moves:
                     continue
-                # Push the box
-                new_boxes.remove((nx, ny))
-                new_boxes.add((bx, by))
+                boxes, cell = self.unpack(key)
+                if not boxes & ~self.goals:
+                    return moves
+                free = self.open & ~boxes
+                frontier = seen = 1 << cell
+                cost = moves + 1
+                while frontier and cost <= T:
+                    for new_boxes, player in self.pushes(boxes, frontier):
+                        k = self.pack(new_boxes, player.bit_length() - 1)
+                        if best.put(k, cost):
+                            buckets.setdefault(cost, bytearray()).extend(k)
+                    frontier = self.grow(frontier, free) & ~seen
+                    seen |= frontier
+                    cost += 1
+        return None
 
-            new_state = ((nx, ny), frozenset(new_boxes))
-            if new_state not in visited:
-                visited.add(new_state)
-                q.append(((nx, ny), frozenset(new_boxes), steps + 1))
+def is_sokoban_solvable(grid, T):
+    """
+    SAT if the boxes can all be pushed onto goals within T moves, else UNSAT.
 
-    return UNSAT
+    Box sets are integer bitboards (see _Bitboards), and pushes onto cells
+    from which no goal can be reached are never made. The search never looks
+    past T moves, so small T stays cheap however large the level is.
+    """
+    level = _Bitboards(grid)
+    if level.player is None:
+        raise ValueError("No player found.")
+
+    # Quick checks
+    if not level.boxes & ~level.goals:
+        return SAT  # trivially satisfied
+    if level.boxes & ~level.live:
+        return UNSAT
+    return SAT if level.fewest_moves(T) is not None else UNSAT
 
 def run_testcase(path):
-    board, T = parse_input(path)
-    result = solve_sokoban([row[:] for row in board], T)
-    # copy board so we don't mutate original
-    expected_result = is_sokoban_solvable(board, T)
-    if expected_result == UNSAT:
-        return result == UNSAT
-    
-    return verify_solution(board, result, T)
+    """
+    Solves one testcase with solve_sokoban and checks it against the oracle, each exactly once.
+
+    Returns a JSON-ready record: whether it passed, the expected and actual
+    results, the solver's encode and solve times and stats (which
+    solve_sokoban fills in), the oracle's time, and anything the solver
+    printed. An exception is recorded as an error instead of being raised.
+    """
+    record = {'name': os.path.basename(path), 'path': path, 'passed': False}
+    output = io.StringIO()
+    try:
+        board, T = parse_input(path)
+        # copy board so we don't mutate original
+        with contextlib.redirect_stdout(output):
+            start = time.perf_counter()
+            stats = {}
+            got = solve_sokoban([row[:] for row in board], T, stats=stats)
+            record['wall_s'] = time.perf_counter() - start
+        start = time.perf_counter()
+        expected_result = is_sokoban_solvable(board, T)
+        record['oracle_s'] = time.perf_counter() - start
+        status = stats.pop('status')
+        record.update(T=T, expected=expected_result, got=got, status=status,
+                      encode_s=stats.get('encode_s', 0.0), solve_s=stats.get('time_s', 0.0), stats=stats)
+        if expected_result == UNSAT:
+            record['passed'] = got == UNSAT
+        else:
+            record['passed'] = got != UNSAT and verify_solution(board, got, T)
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['output'] = output.getvalue()
+    return record
+
+def write_json(records, path):
+    with open(path, 'w') as f:
+        json.dump({'passed': sum(r['passed'] for r in records), 'total': len(records), 'testcases': records},
+                  f, indent=2, default=str, allow_nan=False)
+
+def write_junit(records, path):
+    """JUnit XML report, one <testcase> per testcase, for CI dashboards."""
+    suite = ET.Element('testsuite', name='sokoban', tests=str(len(records)),
+                       failures=str(sum(not r['passed'] and 'error' not in r for r in records)),
+                       errors=str(sum('error' in r for r in records)),
+                       time=f"{sum(r.get('wall_s', 0.0) for r in records):.3f}")
+    for r in records:
+        case = ET.SubElement(suite, 'testcase', classname='sokoban', name=r['name'], time=f"{r.get('wall_s', 0.0):.3f}")
+        if 'error' in r:
+            ET.SubElement(case, 'error', message=r['error'])
+        elif not r['passed']:
+            ET.SubElement(case, 'failure', message=f"expected {r['expected']}, got {r['got']}")
+        if r['output']:
+            ET.SubElement(case, 'system-out').text = r['output']
+    ET.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Sokoban testcases against the BFS oracle.")
+    parser.add_argument('testcases', nargs='*', help="testcase files (default: input/*.txt)")
+    parser.add_argument('--workers', type=int, default=None, help="processes to spread testcases over")
+    parser.add_argument('--json', default=None, help="write a JSON report here")
+    parser.add_argument('--junit', default=None, help="write a JUnit XML report here")
+    args = parser.parse_args()
+
     # If arguments given → use them; else → find all .txt testcases in folder
-    if len(sys.argv) > 1:
-        testcases = sys.argv[1:]
-    else:
-        testcases = sorted(glob.glob("input/*.txt"))
+    testcases = args.testcases or sorted(glob.glob("input/*.txt"))
 
     if not testcases:
         print("No testcases found.")
         sys.exit(1)
 
     passed = 0
-    for idx, tc in enumerate(testcases, start=1):
-        if run_testcase(tc):
-            print(f"Testcase {idx} ({os.path.basename(tc)}): Passed ✅")
-            passed += 1
-        else:
-            print(f"Testcase {idx} ({os.path.basename(tc)}): Failed ❌")
-            print(f"Expected: {is_sokoban_solvable(parse_input(tc)[0], parse_input(tc)[1])}")
-            print(f"Got: {solve_sokoban(parse_input(tc)[0], parse_input(tc)[1])}")
-
+    records = []
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as pool:
+        # map yields in testcase order, each as soon as it and the ones before it are done.
+        for idx, record in enumerate(pool.map(run_testcase, testcases), start=1):
+            records.append(record)
+            timing = f"encode {record.get('encode_s', 0.0):.3f}s, solve {record.get('solve_s', 0.0):.3f}s"
+            if record['passed']:
+                print(f"Testcase {idx} ({record['name']}): Passed ✅ ({timing})")
+                passed += 1
+            else:
+                print(f"Testcase {idx} ({record['name']}): Failed ❌ ({timing})")
+                if 'error' in record:
+                    print(f"Error: {record['error']}")
+                else:
+                    print(f"Expected: {record['expected']}")
+                    print(f"Got: {record['got']}")
+
+    if args.json:
+        write_json(records, args.json)
+    if args.junit:
+        write_junit(records, args.junit)
     print(f"\nSummary: {passed}/{len(testcases)} testcases passed.")
+    sys.exit(0 if passed == len(testcases) else 1)
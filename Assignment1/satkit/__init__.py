@@ -0,0 +1,6 @@
+"""
+satkit
+
+Solver-side helpers shared by the Sudoku (Question1) and Sokoban (Question2)
+solvers.
+"""
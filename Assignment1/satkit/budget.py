@@ -0,0 +1,118 @@
+"""
+budget.py
+
+Bounded SAT calls.
+
+`solve_budgeted` wraps `Solver.solve_limited` with a wall-clock limit (a timer
+that calls `interrupt()`), a conflict limit and a propagation limit, and
+reports SAT, UNSAT or UNKNOWN together with the solver's counters for that
+call. UNKNOWN means a budget ran out before the solver reached an answer.
+Without any limit it is a plain `solve()`, which every backend supports.
+"""
+
+import threading
+import time
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from .portfolio import interruptible
+
+SAT, UNSAT, UNKNOWN = 'SAT', 'UNSAT', 'UNKNOWN'
+
+
+class Budget(NamedTuple):
+    """Limits for one SAT call: seconds, conflicts and propagations; None means unlimited."""
+    time: Optional[float] = None
+    conflicts: Optional[int] = None
+    propagations: Optional[int] = None
+
+
+class BudgetExhausted(Exception):
+    """Raised where a None result would otherwise be taken to mean UNSAT."""
+
+
+def status_of(sat: Optional[bool]) -> str:
+    """Maps a solve_limited result onto SAT/UNSAT/UNKNOWN."""
+    return UNKNOWN if sat is None else SAT if sat else UNSAT
+
+
+def remaining(budget: Optional[Budget], elapsed: float, used: dict) -> Budget:
+    """
+    What is left of `budget` after `elapsed` seconds and the conflicts and
+    propagations counted in `used` (summed solve_budgeted stats).
+    """
+    budget = budget or Budget()
+    return Budget(
+        None if budget.time is None else max(0.0, budget.time - elapsed),
+        None if budget.conflicts is None else max(0, budget.conflicts - used.get('conflicts', 0)),
+        None if budget.propagations is None else max(0, budget.propagations - used.get('propagations', 0)))
+
+
+def exhausted(budget: Optional[Budget]) -> bool:
+    """
+    Whether some limit of `budget` is already used up. pysat reads a zero
+    conflict or propagation budget as no limit at all, so such a budget must
+    not reach the solver.
+    """
+    return budget is not None and any(limit is not None and limit <= 0 for limit in budget)
+
+
+def set_budgets(solver, budget: Optional[Budget]):
+    """
+    Installs the conflict and propagation limits of `budget` on a solver.
+
+    Limits left at None are switched off, so a warm solver does not keep the
+    budget of an earlier call. Backends without propagation limits (CaDiCaL)
+    raise NotImplementedError when one is requested.
+    """
+    budget = budget or Budget()
+    # -1 turns off both limits in the MiniSat-based backends, so reset first and then set.
+    solver.conf_budget(-1)
+    if budget.conflicts is not None:
+        solver.conf_budget(budget.conflicts)
+    if budget.propagations is not None:
+        solver.prop_budget(budget.propagations)
+
+
+def solve_budgeted(solver, backend: str, assumptions: Sequence[int] = (),
+                   budget: Optional[Budget] = None) -> Tuple[str, dict]:
+    """
+    Runs one bounded solve_limited call, or a plain solve() when the budget
+    sets no limit at all (Lingeling has no solve_limited).
+
+    Solvers check their limits at their own granularity (Glucose between
+    restarts), so a call may overshoot a budget somewhat before it stops.
+
+    `backend` is the pysat name the solver was created with; a time limit on
+    a backend that ignores `interrupt()` raises ValueError rather than being
+    silently unenforced. A budget with a limit of zero is already exhausted
+    and answered UNKNOWN without a solver call. Returns (status, stats),
+    where stats holds the restarts, conflicts, decisions and propagations of
+    this call and its wall-clock time in seconds.
+    """
+    budget = budget or Budget()
+    if budget.time is not None and not interruptible(backend):
+        raise ValueError(f"{backend} cannot be interrupted; use a conflict budget instead of a time limit.")
+    if exhausted(budget):
+        return UNKNOWN, dict({key: 0 for key in solver.accum_stats()}, time_s=0.0)
+    limited = budget != Budget()
+    if limited:
+        set_budgets(solver, budget)
+    before = solver.accum_stats()
+    timer = None
+    if budget.time is not None:
+        timer = threading.Timer(budget.time, solver.interrupt)
+        timer.start()
+    start = time.perf_counter()
+    if limited:
+        sat = solver.solve_limited(assumptions=list(assumptions), expect_interrupt=timer is not None)
+    else:
+        sat = solver.solve(assumptions=list(assumptions))
+    elapsed = time.perf_counter() - start
+    if timer is not None:
+        timer.cancel()
+        timer.join()
+        solver.clear_interrupt()
+    after = solver.accum_stats()
+    stats = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+    stats['time_s'] = elapsed
+    return status_of(sat), stats
@@ -0,0 +1,191 @@
+"""
+formula_cache.py
+
+On-disk cache of encoded CNF formulas.
+
+Encoding a formula in Python is often slower than solving it, and the same
+formula is rebuilt for every run on the same input. `FormulaCache` stores each
+formula once under a key built from whatever determines it (the puzzle, the
+horizon, the encoding version) and hands it back on later runs.
+
+Two file formats are supported:
+
+    DIMACS  plain text, readable by any SAT solver (`.cnf`)
+    binary  native-endian int32 words (`.cnfb`):
+                magic, format version, nv, clause count, literal count,
+                one length per clause,
+                the literals of all clauses back to back
+
+A binary file is loaded by memory-mapping it and casting the map to an int32
+memoryview, so a warm run builds no Python lists: the clauses handed to the
+solver are slices of the map.
+"""
+
+import array
+import hashlib
+import mmap
+import os
+import struct
+from typing import Callable, Iterable, Iterator, Optional
+
+MAGIC = 0x42464353  # 'SCFB' in a little-endian file; a byte-swapped file fails the check
+FORMAT_VERSION = 1
+HEADER = struct.Struct('=5i')
+
+
+class Formula:
+    """
+    CNF held as two flat int32 buffers: clause lengths and concatenated literals.
+
+    Iterating yields one int32 memoryview per clause, which pysat solvers
+    accept directly as a clause. `clauses` is the formula itself, so code
+    written against `pysat.formula.CNF` (`len(f.clauses)`, `f.nv`) keeps working.
+    """
+
+    def __init__(self, nv: int, lengths, literals, source=None):
+        self.nv = nv
+        self.lengths = lengths
+        self.literals = literals
+        self._source = source  # keeps a backing mmap open
+
+    @classmethod
+    def from_clauses(cls, clauses: Iterable[Iterable[int]], nv: Optional[int] = None) -> 'Formula':
+        lengths = array.array('i')
+        literals = array.array('i')
+        for clause in clauses:
+            before = len(literals)
+            literals.extend(clause)
+            lengths.append(len(literals) - before)
+        if nv is None:
+            nv = max(map(abs, literals), default=0)
+        return cls(nv, memoryview(lengths), memoryview(literals))
+
+    @property
+    def clauses(self) -> 'Formula':
+        return self
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __iter__(self) -> Iterator[memoryview]:
+        literals = self.literals
+        offset = 0
+        for length in self.lengths:
+            yield literals[offset:offset + length]
+            offset += length
+
+
+def write_binary(path: str, formula: Formula):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, formula.nv, len(formula.lengths), len(formula.literals)))
+        f.write(formula.lengths)
+        f.write(formula.literals)
+
+
+def load_binary(path: str) -> Optional[Formula]:
+    """Memory-maps a binary formula; None when the file is not one written by this version."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            return None
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, nv, nclauses, nliterals = HEADER.unpack_from(buf)
+    if magic != MAGIC or version != FORMAT_VERSION or size != HEADER.size + 4 * (nclauses + nliterals):
+        buf.close()
+        return None
+    words = memoryview(buf)[HEADER.size:].cast('i')
+    return Formula(nv, words[:nclauses], words[nclauses:], source=buf)
+
+
+def write_dimacs(path: str, formula: Formula):
+    with open(path, 'w') as f:
+        f.write(f"p cnf {formula.nv} {len(formula)}\n")
+        for clause in formula:
+            f.write(' '.join(map(str, clause)))
+            f.write(' 0\n')
+
+
+def load_dimacs(path: str) -> Formula:
+    """Parses a DIMACS file; clauses may span lines, comments start with 'c'."""
+    nv = None
+    literals = array.array('i')
+    with open(path) as f:
+        for line in f:
+            if line.startswith('c'):
+                continue
+            if line.startswith('p'):
+                nv = int(line.split()[2])
+                continue
+            literals.extend(map(int, line.split()))
+    lengths = array.array('i')
+    flat = array.array('i')
+    start = 0
+    for i, lit in enumerate(literals):
+        if lit == 0:
+            lengths.append(i - start)
+            flat.extend(literals[start:i])
+            start = i + 1
+    if nv is None:
+        nv = max(map(abs, flat), default=0)
+    return Formula(nv, memoryview(lengths), memoryview(flat))
+
+
+FORMATS = {'binary': ('.cnfb', write_binary, load_binary),
+           'dimacs': ('.cnf', write_dimacs, load_dimacs)}
+
+
+def formula_key(*parts) -> str:
+    """Stable file-name key for the values that determine a formula."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+class FormulaCache:
+    """
+    Directory of encoded formulas, one file per key, in the binary or DIMACS format.
+
+    Files are written to a temporary name and renamed into place, so
+    concurrent writers never expose a partial file to readers.
+    """
+
+    def __init__(self, directory: str, fmt: str = 'binary'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown formula format {fmt!r}, expected one of {tuple(FORMATS)}.")
+        self.directory = directory
+        self.fmt = fmt
+        self.hits = self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + FORMATS[self.fmt][0])
+
+    def get(self, key: str) -> Optional[Formula]:
+        path = self.path(key)
+        formula = FORMATS[self.fmt][2](path) if os.path.exists(path) else None
+        if formula is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return formula
+
+    def put(self, key: str, formula: Formula):
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        FORMATS[self.fmt][1](tmp, formula)
+        os.replace(tmp, path)
+
+    def get_or_build(self, parts: tuple, build: Callable) -> Formula:
+        """
+        Returns the cached formula for `parts`, encoding it with `build()` on a miss.
+
+        `build` may return a Formula, a pysat CNF or a list of clauses.
+        """
+        key = formula_key(*parts)
+        formula = self.get(key)
+        if formula is None:
+            built = build()
+            if isinstance(built, Formula):
+                formula = built
+            else:
+                formula = Formula.from_clauses(getattr(built, 'clauses', built), getattr(built, 'nv', None))
+            self.put(key, formula)
+        return formula
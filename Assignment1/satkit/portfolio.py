@@ -0,0 +1,187 @@
+"""
+portfolio.py
+
+Runs one CNF on several pysat backends in parallel and keeps the first answer.
+
+Every backend gets its own process. When one of them finishes, the others are
+asked to stop through a shared flag; a watcher thread in each loser calls
+`Solver.interrupt()`, so the losers leave `solve_limited` normally and exit
+on their own. Backends that cannot be interrupted (CaDiCaL keeps the GIL and
+ignores `interrupt()`) and any process that does not stop within a grace
+period are terminated instead.
+
+A backend that fails (an unknown name, a crashed solver, a budget it cannot
+enforce) reports an error rather than an answer. When every backend fails the
+race raises PortfolioError, so a failure is never mistaken for a budget that
+ran out.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from typing import List, NamedTuple, Optional, Sequence
+
+from pysat.solvers import Solver, SolverNames
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKENDS = ('glucose3', 'cadical195', 'minisat22')
+# How often the parent checks for backends that died without reporting.
+POLL_INTERVAL = 0.1
+
+
+class PortfolioError(RuntimeError):
+    """Raised when every backend of a race failed without an answer."""
+
+
+class PortfolioResult(NamedTuple):
+    """
+    Winning backend, True/False for SAT/UNSAT (None if nobody finished), its
+    model and the winner's solver counters.
+    """
+    backend: Optional[str]
+    sat: Optional[bool]
+    model: Optional[List[int]]
+    elapsed: float
+    stats: dict = {}
+
+
+def interruptible(backend: str) -> bool:
+    """Whether `Solver.interrupt()` works for a backend name or alias."""
+    return not any(backend in aliases for family, aliases in vars(SolverNames).items()
+                   if family.startswith(('cadical', 'kissat', 'lingeling')))
+
+
+def _watch(stop, done, solver):
+    # A multiprocessing.Event cannot be used for `stop`: Event.set() waits for
+    # every waiter to wake up, which a process stuck in a GIL-holding solver never does.
+    while not stop.value:
+        if done.wait(0.01):
+            return
+    solver.interrupt()
+
+
+def _race(backend, clauses, assumptions, conflicts, propagations, stop, results):
+    try:
+        _solve(backend, clauses, assumptions, conflicts, propagations, stop, results)
+    except Exception:
+        # A bad backend name or a failing solver must still answer, or the parent waits for it.
+        logger.exception("portfolio: %s failed", backend)
+        results.put((backend, None, None, 0.0, {}, traceback.format_exc(limit=0).strip()))
+
+
+def _solve(backend, clauses, assumptions, conflicts, propagations, stop, results):
+    with Solver(name=backend, bootstrap_with=clauses) as solver:
+        if conflicts is not None:
+            solver.conf_budget(conflicts)
+        if propagations is not None:
+            try:
+                solver.prop_budget(propagations)
+            except NotImplementedError:
+                logger.info("portfolio: %s has no propagation budget, dropping out", backend)
+                results.put((backend, None, None, 0.0, {}, f"{backend} has no propagation budget"))
+                return
+        done = threading.Event()
+        watcher = None
+        if interruptible(backend):
+            watcher = threading.Thread(target=_watch, args=(stop, done, solver), daemon=True)
+            watcher.start()
+        start = time.perf_counter()
+        sat = solver.solve_limited(assumptions=list(assumptions), expect_interrupt=watcher is not None)
+        elapsed = time.perf_counter() - start
+        done.set()
+        if watcher is not None:
+            watcher.join()
+        if stop.value:
+            # Someone else already won; keep large models out of the queue.
+            logger.info("portfolio: %s stopped after %.3fs", backend, elapsed)
+            return
+        if sat is None:
+            # Out of conflict or propagation budget: report it so that the
+            # parent does not wait for an answer that will never come.
+            logger.info("portfolio: %s ran out of budget after %.3fs", backend, elapsed)
+            results.put((backend, None, None, elapsed, solver.accum_stats(), None))
+            return
+        logger.info("portfolio: %s finished in %.3fs (%s)", backend, elapsed, 'SAT' if sat else 'UNSAT')
+        results.put((backend, sat, solver.get_model() if sat else None, elapsed, solver.accum_stats(), None))
+    stop.value = 1
+
+
+def solve_portfolio(clauses, backends: Sequence[str] = DEFAULT_BACKENDS, assumptions: Sequence[int] = (),
+                    timeout: Optional[float] = None, grace: float = 1.0,
+                    conflicts: Optional[int] = None, propagations: Optional[int] = None) -> PortfolioResult:
+    """
+    Solves `clauses` on every backend at once and returns the first answer.
+
+    `timeout` bounds the whole race in seconds; when it expires every backend
+    is interrupted and the result has sat=None. `conflicts` and
+    `propagations` limit each backend separately; the result also has
+    sat=None when every backend ran out of them, and straight away when a
+    limit is zero. Raises PortfolioError when every backend failed or died
+    instead of answering.
+    """
+    if any(limit is not None and limit <= 0 for limit in (timeout, conflicts, propagations)):
+        # pysat reads a zero budget as no limit; nothing is left to race with.
+        return PortfolioResult(None, None, None, 0.0, {})
+    ctx = multiprocessing.get_context()
+    stop = ctx.RawValue('b', 0)
+    results = ctx.Queue()
+    clauses = [list(cl) for cl in clauses]
+    procs = [ctx.Process(target=_race, args=(b, clauses, assumptions, conflicts, propagations, stop, results),
+                         daemon=True)
+             for b in backends]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    backend = sat = model = None
+    stats = {}
+    errors = []
+    pending = len(procs)
+    while pending:
+        remaining = None if timeout is None else timeout - (time.perf_counter() - start)
+        if remaining is not None and remaining <= 0:
+            backend = sat = model = None
+            stats = {}
+            break
+        try:
+            record = results.get(timeout=POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining))
+        except queue.Empty:
+            if any(p.is_alive() for p in procs):
+                continue
+            # A process may have written its answer just before it exited and
+            # after the get above gave up, so read what is left before giving up.
+            try:
+                record = results.get_nowait()
+            except queue.Empty:
+                # A process killed outright (e.g. out of memory) never reports.
+                logger.info("portfolio: %d backend(s) exited without an answer", pending)
+                errors += ["exited without an answer"] * pending
+                backend = sat = model = None
+                stats = {}
+                break
+        pending -= 1
+        if record[-1] is not None:
+            errors.append(f"{record[0]}: {record[-1]}")
+            continue
+        backend, sat, model, _, stats, _ = record
+        if sat is not None:
+            break
+    if sat is None:
+        backend = None
+    stop.value = 1
+    elapsed = time.perf_counter() - start
+    for p in procs:
+        p.join(grace)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+    if sat is None and len(errors) == len(procs):
+        raise PortfolioError("every backend failed: " + "; ".join(errors))
+    if backend is None:
+        logger.info("portfolio: no backend finished within %.3fs", elapsed)
+    else:
+        logger.info("portfolio winner: %s in %.3fs", backend, elapsed)
+    return PortfolioResult(backend, sat, model, elapsed, stats)
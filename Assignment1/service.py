@@ -0,0 +1,263 @@
+"""
+service.py
+
+Long-running solving service for the Sudoku (Question1) and Sokoban (Question2)
+solvers, speaking newline-delimited JSON over a Unix socket or stdin/stdout.
+
+    python service.py --socket /tmp/satkit.sock --workers 4
+    python service.py --stdin < requests.jsonl
+
+Requests, one JSON object per line ("id" is echoed back and optional):
+
+    {"id": 1, "type": "sudoku", "grid": [[5, 3, 0, ...], ...]}
+    {"id": 2, "type": "sokoban", "grid": [["#", "P", ...], ...], "T": 20}
+    {"id": 3, "type": "stats"}
+    {"id": 4, "type": "health"}
+
+Solve requests may also carry "deadline" (seconds) and "conflicts" /
+"propagations" budgets (non-negative integers). A request with a malformed
+field is answered with ERROR before it reaches a worker. Responses stream back
+as the workers finish, so their order may differ from the requests:
+
+    {"id": 1, "status": "SAT", "grid": [...], "stats": {...}, "elapsed": 0.004}
+    {"id": 2, "status": "SAT", "moves": ["R", "D"], "stats": {...}, "elapsed": 0.31}
+
+status is SAT, UNSAT, UNKNOWN (budget or deadline ran out) or ERROR (with an
+"error" message). Solving happens in a pool of worker processes that import
+pysat and build the 9x9 Sudoku engine once, at startup. The workers come from
+a forkserver, so they never hold on to the service's sockets. Each connection has
+at most --max-inflight requests in progress; further lines are not read until
+one finishes, so a fast client is slowed down by the socket buffers instead
+of queueing unbounded work.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, 'Question1'), os.path.join(HERE, 'Question2')]
+
+import q1
+import q2
+from satkit.budget import UNKNOWN, Budget
+
+# Lines longer than this (a 36x36 Sudoku is about 5 KB) are rejected.
+LINE_LIMIT = 1 << 20
+# Time given to a worker past the deadline to return its own UNKNOWN answer.
+DEADLINE_GRACE = 0.5
+
+
+def _warm_worker():
+    """Pool initializer: silence the solvers' prints and pre-encode the 9x9 engine."""
+    sys.stdout = open(os.devnull, 'w')
+    q1.get_engine(9)
+
+
+def _solve(request: dict) -> dict:
+    """Runs one solve request in a worker process."""
+    budget = Budget(request.get('deadline'), request.get('conflicts'), request.get('propagations'))
+    kind = request.get('type')
+    if kind == 'sudoku':
+        # A service sees the same puzzles again, so it pays for the symmetry cache.
+        result = q1.solve_sudoku_result(request['grid'], budget, q1.solution_cache)
+        if result.status == 'ERROR':
+            return {'status': result.status, 'error': result.stats['error']}
+        return {'status': result.status, 'grid': result.grid, 'stats': result.stats}
+    if kind == 'sokoban':
+        result = q2.solve_sokoban_result(request['grid'], request['T'], budget)
+        return {'status': result.status, 'moves': result.moves, 'stats': result.stats}
+    raise ValueError(f"Unknown request type {kind!r}.")
+
+
+def check_request(request: dict):
+    """Raises ValueError for a solve request whose fields the workers cannot use."""
+    kind = request.get('type')
+    if kind not in ('sudoku', 'sokoban'):
+        raise ValueError(f"Unknown request type {kind!r}.")
+    for key, types in (('deadline', (int, float)), ('conflicts', int), ('propagations', int)):
+        value = request.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types)
+                                  or not 0 <= value < float('inf')):
+            raise ValueError(f"{key} must be a non-negative {'number' if key == 'deadline' else 'integer'}.")
+    grid = request.get('grid')
+    if not isinstance(grid, list) or not grid or not all(isinstance(row, list) for row in grid):
+        raise ValueError("grid must be a list of rows.")
+    if kind == 'sokoban':
+        T = request.get('T')
+        if isinstance(T, bool) or not isinstance(T, int) or T < 0:
+            raise ValueError("T must be a non-negative integer.")
+
+
+class SolverService:
+    """Dispatches JSON-lines requests to a pool of warm worker processes."""
+
+    def __init__(self, workers: int = None, max_inflight: int = 64):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.workers, multiprocessing.get_context('forkserver'),
+                                                           initializer=_warm_worker)
+        # Start and warm every worker now rather than on the first request.
+        for future in [self.pool.submit(int) for _ in range(self.workers)]:
+            future.result()
+        self.started = time.monotonic()
+        self.counts = {'received': 0, 'completed': 0, 'SAT': 0, 'UNSAT': 0, 'UNKNOWN': 0, 'ERROR': 0}
+        self.inflight = 0
+        self.solve_time = 0.0
+
+    def stats(self) -> dict:
+        completed = self.counts['completed']
+        return dict(self.counts, inflight=self.inflight, workers=self.workers,
+                    uptime_s=time.monotonic() - self.started,
+                    mean_latency_s=self.solve_time / completed if completed else 0.0)
+
+    async def handle(self, request: dict) -> dict:
+        """Answers one request; never raises."""
+        kind = request.get('type')
+        if kind == 'health':
+            return {'status': 'ok', 'workers': self.workers, 'inflight': self.inflight}
+        if kind == 'stats':
+            return self.stats()
+        self.counts['received'] += 1
+        self.inflight += 1
+        start = time.monotonic()
+        deadline = request.get('deadline')
+        try:
+            # Checked here, before a worker is tied up with a request it cannot run.
+            check_request(request)
+            future = asyncio.get_running_loop().run_in_executor(self.pool, _solve, request)
+            timeout = deadline + DEADLINE_GRACE if deadline is not None else None
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # The worker stops on its own budget; the client gets its answer now.
+            response = {'status': UNKNOWN, 'error': 'deadline exceeded'}
+        except Exception as e:
+            response = {'status': 'ERROR', 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.inflight -= 1
+        elapsed = time.monotonic() - start
+        self.solve_time += elapsed
+        self.counts['completed'] += 1
+        self.counts[response['status']] += 1
+        response['elapsed'] = elapsed
+        return response
+
+    async def serve(self, reader, writer):
+        """
+        Serves one stream until EOF, writing each response as soon as it is ready.
+
+        `reader` and `writer` are asyncio streams or anything with the same
+        readline/write/drain/close methods.
+        """
+        slots = asyncio.Semaphore(self.max_inflight)
+        pending = set()
+
+        async def answer(line: bytes):
+            try:
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    request, response = {}, {'status': 'ERROR', 'error': f"bad request: {e}"}
+                else:
+                    response = await self.handle(request)
+                if 'id' in request:
+                    response = dict(id=request['id'], **response)
+                writer.write(json.dumps(response, allow_nan=False).encode() + b'\n')
+                await writer.drain()
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line over LINE_LIMIT; the stream cannot be resynchronized.
+                    slots.release()
+                    writer.write(b'{"status": "ERROR", "error": "request line too long"}\n')
+                    break
+                if not line:
+                    slots.release()
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.ensure_future(answer(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.wait(pending)
+            await writer.drain()
+        except ConnectionError:
+            for task in pending:
+                task.cancel()
+        finally:
+            writer.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve_socket(service: SolverService, path: str):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(service.serve, path, limit=LINE_LIMIT)
+    async with server:
+        await server.serve_forever()
+
+
+class _StdioStream:
+    """
+    Reader/writer pair over stdin and stdout for SolverService.serve.
+
+    Lines are read in a thread one at a time, only when serve asks for one,
+    so stdin is never read ahead of the in-flight limit. Unlike asyncio pipe
+    transports this also works when stdin or stdout are regular files.
+    """
+
+    async def readline(self) -> bytes:
+        line = await asyncio.get_running_loop().run_in_executor(None, sys.stdin.buffer.readline)
+        if len(line) > LINE_LIMIT:
+            raise ValueError("line too long")
+        return line
+
+    def write(self, data: bytes):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def serve_stdio(service: SolverService):
+    stream = _StdioStream()
+    await service.serve(stream, stream)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON-lines Sudoku/Sokoban solving service.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--socket', help="listen on this Unix socket path")
+    source.add_argument('--stdin', action='store_true', help="read requests from stdin, answer on stdout")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-inflight', type=int, default=64, help="per-connection limit on open requests")
+    args = parser.parse_args()
+
+    service = SolverService(args.workers, args.max_inflight)
+    try:
+        asyncio.run(serve_socket(service, args.socket) if args.socket else serve_stdio(service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()